@@ -80,28 +80,22 @@ async def fuse_component_data(part_type: str, search_query: str):
     valid_candidates = [c for c in candidates if c is not None]
     if not valid_candidates: return None
 
-    best_spec_candidate = None
+    # One pass over the candidates (kept in search-relevance order):
+    # - specs: first vision-verified candidate, else first text-inferred one
+    # - price/link: first candidate with a real price (normally the top
+    #   result; later ones only stand in when it is missing a price)
+    best_vision = best_text = best_priced = None
     for c in valid_candidates:
-        specs = c['engineering_data']
-        if specs.get('source') == "vision":
-            best_spec_candidate = c
-            break
-        if specs.get('source') == "text_inference":
-            best_spec_candidate = c
-    
-    if not best_spec_candidate:
-        best_spec_candidate = valid_candidates[0]
+        source = c['engineering_data'].get('source')
+        if source == "vision":
+            if best_vision is None: best_vision = c
+        elif source == "text_inference":
+            if best_text is None: best_text = c
+        if best_priced is None and c['price'] and c['price'] != "Check Site":
+            best_priced = c
 
-    # Use price/link from first result (relevance), but if the first result 
-    # has no price, try to find a candidate that DOES have a price.
-    primary_link = valid_candidates[0]
-    
-    # Price Optimization: Find a candidate with a real price if primary is missing it
-    if not primary_link['price'] or primary_link['price'] == "Check Site":
-        for c in valid_candidates:
-            if c['price'] and c['price'] != "Check Site":
-                primary_link = c # Swap primary if we found a better price source
-                break
+    best_spec_candidate = best_vision or best_text or valid_candidates[0]
+    primary_link = best_priced or valid_candidates[0]
 
     composite_part = {
         "part_type": part_type,
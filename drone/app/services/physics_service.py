@@ -1,12 +1,99 @@
 # FILE: app/services/physics_service.py
 import subprocess
-import json
+import functools
+import bisect
+import importlib.util
+import orjson
 import os
 import re
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 SIM_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "simulation", "calc_twr.py")
+# Set PHYSICS_SUBPROCESS=1 to run the model in its own interpreter (isolation)
+USE_SUBPROCESS = os.getenv("PHYSICS_SUBPROCESS", "0") == "1"
+
+def _load_sim_model():
+    """Imports simulation/calc_twr.py once; the model is a pure function of its input dict."""
+    spec = importlib.util.spec_from_file_location("calc_twr", SIM_SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.calculate_flight_characteristics
+
+calculate_flight_characteristics = _load_sim_model()
+
+# Part kinds, resolved once per distinct part_type string
+_MOTOR, _FRAME, _FC, _BATT, _PROP, _CAM, _OTHER = range(7)
+KV_RE = re.compile(r"(\d{3,5})\s?kv")
+MAH_RE = re.compile(r"(\d{3,4})\s?mah")
+CELLS_RE = re.compile(r"(\d)s")
+# Stator code -> (weight per motor g, heuristic thrust per motor g); earlier
+# entries take priority when a title names more than one
+MOTOR_CLASSES = {
+    "2207": (35.0, 1200.0),
+    "2306": (35.0, 1200.0),
+    "1404": (10.0, 300.0),
+}
+WHOOP_MOTOR = (2.5, 40.0) # Whoop default
+MOTOR_CLASS_RE = re.compile("|".join(map(re.escape, MOTOR_CLASSES)))
+# Thrust per motor by KV: <= 2000, <= 10000, above
+KV_THRUST_BOUNDS = (2000, 10000)
+KV_THRUSTS = (1300.0, 600.0, 40.0)
+
+# The optimizer re-simulates near-identical BOMs every iteration, so the
+# per-row work below is cached on the raw strings it depends on: a repeated
+# row costs a dict lookup (str hashes are cached), no lower() or regex.
+@functools.lru_cache(maxsize=256)
+def _classify(part_type: str) -> int:
+    pt = part_type.lower()
+    if "motor" in pt: return _MOTOR
+    if "frame" in pt or "chassis" in pt: return _FRAME
+    if "fc" in pt or "stack" in pt or "controller" in pt: return _FC
+    if "battery" in pt or "lipo" in pt: return _BATT
+    if "prop" in pt: return _PROP
+    if "camera" in pt or "video" in pt or "vtx" in pt: return _CAM
+    return _OTHER
+
+@functools.lru_cache(maxsize=4096)
+def _extract_motor(product_name: str):
+    """Returns (weight of 4 motors, kv or None, max thrust per motor)."""
+    name = product_name.lower()
+    # Estimate weight based on size heuristic (one scan for every stator code)
+    found = {match.group(0) for match in MOTOR_CLASS_RE.finditer(name)}
+    weight_per_motor, thrust_per_motor = next(
+        (MOTOR_CLASSES[code] for code in MOTOR_CLASSES if code in found), WHOOP_MOTOR)
+
+    # Extract KV (look for 4-5 digits followed by kv)
+    kv_match = KV_RE.search(name)
+    if not kv_match:
+        # If we didn't get KV, use the heuristic thrust
+        return weight_per_motor * 4, None, thrust_per_motor
+    kv = int(kv_match.group(1))
+    # Refine thrust if we have KV context
+    return weight_per_motor * 4, kv, KV_THRUSTS[bisect.bisect_left(KV_THRUST_BOUNDS, kv)]
+
+@functools.lru_cache(maxsize=4096)
+def _extract_battery(product_name: str):
+    """Returns (capacity mAh or None, cell count or None)."""
+    name = product_name.lower()
+    cap_match = MAH_RE.search(name)
+    cell_match = CELLS_RE.search(name)
+    return (int(cap_match.group(1)) if cap_match else None,
+            int(cell_match.group(1)) if cell_match else None)
+
+@functools.lru_cache(maxsize=4096)
+def _extract_weight(kind: int, product_name: str, part_type: str) -> float:
+    """Fixed-weight heuristics for frames, flight controllers and cameras."""
+    name = product_name.lower()
+    if kind == _FRAME:
+        if "5" in name or "freestyle" in name or "volador" in name: return 120.0
+        if "3" in name: return 40.0
+        return 10.0 # Whoop frame
+    if kind == _FC:
+        return 15.0 if "stack" in part_type.lower() else 5.0
+    if kind == _CAM:
+        return 35.0 if "air unit" in name or "o3" in name else 5.0
+    return 0.0
 
 def run_physics_simulation(bom_data: list) -> dict:
     total_weight = 0.0
@@ -21,81 +108,41 @@ def run_physics_simulation(bom_data: list) -> dict:
         return {"error": "BOM is empty"}
 
     for item in bom_data:
-        # Normalize text for robust matching
-        pt = str(item.get("part_type", "")).lower()
-        name = str(item.get("product_name", "")).lower()
-        
-        # -- Weight & Specs Estimation --
-        
-        # 1. MOTORS
-        if "motor" in pt: 
-            # Estimate weight based on size heuristic
-            if "2207" in name or "2306" in name:
-                weight_per_motor = 35.0
-                thrust_per_motor = 1200.0
-            elif "1404" in name:
-                weight_per_motor = 10.0
-                thrust_per_motor = 300.0
-            else:
-                weight_per_motor = 2.5 # Whoop default
-                thrust_per_motor = 40.0
+        part_type = str(item.get("part_type", ""))
+        kind = _classify(part_type)
+        if kind == _OTHER:
+            continue
+        # Extractors lowercase (once per distinct name) for robust matching
+        name = str(item.get("product_name", ""))
 
-            total_weight += (weight_per_motor * 4)
-            
-            # Extract KV (look for 4-5 digits followed by kv)
-            kv_match = re.search(r"(\d{3,5})\s?kv", name)
-            if kv_match:
-                motor_kv = int(kv_match.group(1))
-                # Refine thrust if we have KV context
-                if motor_kv > 10000: max_thrust = 40.0
-                elif motor_kv > 2000: max_thrust = 600.0
-                else: max_thrust = 1300.0
-            else:
-                # If we didn't get KV, use the heuristic thrust
-                max_thrust = thrust_per_motor
-
-        # 2. FRAME / CHASSIS
-        elif "frame" in pt or "chassis" in pt: 
-            if "5" in name or "freestyle" in name or "volador" in name:
-                total_weight += 120.0
-            elif "3" in name:
-                total_weight += 40.0
-            else:
-                total_weight += 10.0 # Whoop frame
-
-        # 3. FLIGHT CONTROLLER
-        elif "fc" in pt or "stack" in pt or "controller" in pt:
-            total_weight += 15.0 if "stack" in pt else 5.0
+        # -- Weight & Specs Estimation --
+        if kind == _MOTOR:
+            weight, kv, max_thrust = _extract_motor(name)
+            total_weight += weight
+            if kv is not None:
+                motor_kv = kv
 
-        # 4. BATTERY
-        elif "battery" in pt or "lipo" in pt:
-            # Capacity
-            cap_match = re.search(r"(\d{3,4})\s?mah", name)
-            if cap_match: battery_cap = int(cap_match.group(1))
-            
-            # Cells / Voltage
-            cell_match = re.search(r"(\d)s", name)
-            if cell_match:
-                cells = int(cell_match.group(1))
+        elif kind == _BATT:
+            cap, cells = _extract_battery(name)
+            if cap is not None: battery_cap = cap
+            if cells is not None:
                 voltage = cells * 3.7
                 # Weight heuristic: approx 20g per 1000mah per cell
                 # 1000mah 6S = ~160g
                 weight_est = (battery_cap / 1000) * cells * 26
                 total_weight += weight_est if weight_est > 0 else (cells * 10)
             else:
-                 # Fallback if S count missing but it's a battery
-                 total_weight += 50.0
+                # Fallback if S count missing but it's a battery
+                total_weight += 50.0
 
-        # 5. PROPS
-        elif "prop" in pt:
+        elif kind == _PROP:
             specs = item.get("engineering_specs", {})
             if specs.get("diameter_mm"):
                 prop_diam = specs.get("diameter_mm") / 25.4
             total_weight += 10.0 # Set of 4 props
 
-        # 6. CAMERA / VTX / ANTENNA
-        elif "camera" in pt or "video" in pt or "vtx" in pt:
-            total_weight += 35.0 if "air unit" in name or "o3" in name else 5.0
+        else: # Frame / chassis, flight controller, camera / VTX
+            total_weight += _extract_weight(kind, name, part_type)
     
     # Safety Fallback: If logic failed completely, give it a base weight so math works
     if total_weight < 5: 
@@ -112,20 +159,29 @@ def run_physics_simulation(bom_data: list) -> dict:
         "prop_pitch_inch": prop_pitch
     }
     
+    if not USE_SUBPROCESS:
+        # In-process call: no fork/exec, interpreter start-up or JSON round-trip
+        try:
+            return calculate_flight_characteristics(sim_input)
+        except Exception as e:
+            print(f"Physics Exception: {e}")
+            return {"error": str(e)}
+
     try:
         process = subprocess.Popen(
             ["python3", SIM_SCRIPT_PATH],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True
         )
-        stdout, stderr = process.communicate(input=json.dumps(sim_input))
+        # Bytes end to end: orjson encodes/decodes without a str round-trip
+        payload = orjson.dumps(sim_input)
+        stdout, stderr = process.communicate(input=payload)
         if stderr: 
-            print(f"Physics STDERR: {stderr}")
+            print(f"Physics STDERR: {stderr.decode(errors='replace')}")
             return {"error": "Simulation script error"}
             
-        return json.loads(stdout)
+        return orjson.loads(stdout)
     except Exception as e:
         print(f"Physics Exception: {e}")
         return {"error": str(e)}
\ No newline at end of file
@@ -1,7 +1,21 @@
 # FILE: app/services/search_service.py
+import threading
 from googleapiclient.discovery import build
 from app.config import settings
 
+# The discovery Resource is built once per thread and reused: building it
+# parses the discovery document and generates the whole method graph. Not
+# shared across threads because its httplib2 transport is not thread-safe.
+_cse_local = threading.local()
+
+def _get_cse_service():
+    service = getattr(_cse_local, "service", None)
+    if service is None:
+        service = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY,
+                        cache_discovery=False, static_discovery=True)
+        _cse_local.service = service
+    return service
+
 def find_components(query: str, limit: int = 5) -> list[dict]:
     """
     Searches Google Custom Search API for drone components.
@@ -14,7 +28,7 @@ def find_components(query: str, limit: int = 5) -> list[dict]:
     print(f"🔎 Google Search: '{query}'...")
 
     try:
-        service = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY)
+        service = _get_cse_service()
         
         # Append 'buy' or 'price' to ensure we get e-commerce results if not present
         search_query = query if "buy" in query or "price" in query else f"{query} buy"
@@ -3,6 +3,9 @@ import sys
 import json
 import math
 
+# Area (dm^2) of one prop disc per inch^2 of diameter: pi * (d * 2.54 / 2)^2 / 100
+DISC_AREA_DM2_PER_IN2 = math.pi * 1.27 * 1.27 / 100
+
 def calculate_flight_characteristics(data):
     """
     Advanced Flight Physics Model.
@@ -38,9 +41,7 @@ def calculate_flight_characteristics(data):
     # Measures "floatiness" vs "aggressiveness"
     # Area of one prop disc in sq dm
     if prop_diam_inch > 0:
-        radius_cm = (prop_diam_inch * 2.54) / 2
-        area_dm2 = (math.pi * (radius_cm ** 2)) / 100
-        total_disc_area = area_dm2 * num_motors
+        total_disc_area = DISC_AREA_DM2_PER_IN2 * prop_diam_inch * prop_diam_inch * num_motors
         disk_loading = weight_g / total_disc_area
     else:
         disk_loading = 0
@@ -1,6 +1,6 @@
 import cadquery as cq
 from app.cad.components import Motor, Propeller, FlightControllerStack, Battery
-from app.cad.frame import FrameGenerator
+from app.cad.frame import FrameGenerator, COS_45
 
 class DroneAssembler:
     """
@@ -21,7 +21,7 @@ class DroneAssembler:
         # Distance from center to motor shaft
         self.radius = self.wb / 2.0
         # X/Y offset for 45 degree arms
-        self.offset = self.radius * 0.70710678 
+        self.offset = self.radius * COS_45
 
     def build(self):
         """Constructs the full assembly hierarchy."""
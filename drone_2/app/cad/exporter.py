@@ -1,6 +1,115 @@
 import os
+import functools
+import numpy as np
 import cadquery as cq
 from app.cad.assembly import DroneAssembler
+from app.cad.components import FlightControllerStack, Battery, Motor, Propeller
+from app.cad.frame import FrameGenerator
+
+# --- GEOMETRY MEMO ---
+# The auto-engineer loop re-exports every generation while varying one or two
+# parameters; parts whose inputs did not change are reused, not rebuilt in
+# OpenCascade. Workplane ops (translate/union) return new objects, so the
+# cached solids are never modified.
+@functools.lru_cache(maxsize=32)
+def _frame_cached(wheelbase_mm, motor_mount_mm, stack_mount_mm, arm_thickness_mm):
+    return FrameGenerator({
+        "wheelbase_mm": wheelbase_mm, "motor_mount_mm": motor_mount_mm,
+        "stack_mount_mm": stack_mount_mm, "arm_thickness_mm": arm_thickness_mm,
+    }).generate()
+
+@functools.lru_cache(maxsize=1)
+def _stack_cached():
+    return FlightControllerStack().build()
+
+@functools.lru_cache(maxsize=1)
+def _battery_cached():
+    return Battery().build()
+
+@functools.lru_cache(maxsize=32)
+def _motor_cached(mounting_mm):
+    return Motor(mounting_mm=mounting_mm).build()
+
+@functools.lru_cache(maxsize=32)
+def _prop_cached(diameter_inch):
+    return Propeller(diameter_inch=diameter_inch).build()
+
+@functools.lru_cache(maxsize=64)
+def _bounds(part):
+    """(xmin, ymin, zmin, xmax, ymax, zmax) in mm of a cached part; one OCCT pass per part."""
+    boxes = [shape.BoundingBox() for shape in part.vals()]
+    return (min(b.xmin for b in boxes), min(b.ymin for b in boxes), min(b.zmin for b in boxes),
+            max(b.xmax for b in boxes), max(b.ymax for b in boxes), max(b.zmax for b in boxes))
+
+def _merge_bounds(placed):
+    """Bounds of an assembly from [(part_bounds, (x, y, z) placement), ...], no OCCT call."""
+    lo = [min(b[i] + at[i] for b, at in placed) for i in range(3)]
+    hi = [max(b[i + 3] + at[i] for b, at in placed) for i in range(3)]
+    return (*lo, *hi)
+
+# --- URDF TEMPLATES ---
+# Mesh scale 0.001: the STLs are in mm, URDF is in meters
+URDF_HEADER_TMPL = """<?xml version="1.0"?>
+<robot name="{project_name}">
+
+  <link name="base_link">
+    <inertial>
+      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <mass value="{base_mass_kg}"/>
+      {base_inertia}
+    </inertial>
+    <visual>
+      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <geometry>
+        <mesh filename="base.stl" scale="0.001 0.001 0.001"/> 
+      </geometry>
+      <material name="grey">
+        <color rgba="0.2 0.2 0.2 1.0"/>
+      </material>
+    </visual>
+    <collision>
+      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <geometry>
+        <mesh filename="base.stl" scale="0.001 0.001 0.001"/>
+      </geometry>
+    </collision>
+  </link>
+
+"""
+
+PROP_LINK_TMPL = """
+  <link name="{name}">
+    <inertial>
+      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <mass value="{prop_mass_kg}"/>
+      {prop_inertia}
+    </inertial>
+    <visual>
+      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <geometry>
+        <mesh filename="prop.stl" scale="0.001 0.001 0.001"/>
+      </geometry>
+      <material name="cyan">
+        <color rgba="0 0.8 0.8 1.0"/>
+      </material>
+    </visual>
+    <collision>
+      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <geometry>
+        <cylinder length="0.01" radius="{prop_radius_m}"/>
+      </geometry>
+    </collision>
+  </link>
+"""
+
+PROP_JOINT_TMPL = """
+  <joint name="joint_{name}" type="continuous">
+    <parent link="base_link"/>
+    <child link="{name}"/>
+    <origin rpy="0 0 0" xyz="{pos}"/>
+    <axis xyz="0 0 1"/>
+  </joint>
+"""
 
 class URDFExporter:
     """
@@ -11,23 +120,25 @@ class URDFExporter:
         self.assembler = assembler
         self.specs = assembler.specs
         
-    def _get_inertia_xml(self, shape, mass_kg):
-        """Calculates approximate inertia tensor from bounding box."""
-        # Extract the underlying Solid from the Workplane
-        solid = shape.val()
-        bb = solid.BoundingBox()
+    def _get_inertia_xml(self, bounds, masses_kg):
+        """
+        Calculates approximate inertia tensors from bounding boxes, for all links at once.
+        bounds: one (xmin, ymin, zmin, xmax, ymax, zmax) mm box per link (see _bounds);
+        masses_kg: one mass per link. Returns one <inertia/> element per link.
+        """
+        boxes = np.asarray(bounds, dtype=float)
+        masses = np.asarray(masses_kg, dtype=float)
         
-        # Dimensions in METERS for physics calculation
-        dx = (bb.xmax - bb.xmin) / 1000.0 
-        dy = (bb.ymax - bb.ymin) / 1000.0
-        dz = (bb.zmax - bb.zmin) / 1000.0
+        # Dimensions in METERS for physics calculation (one row per link)
+        dx, dy, dz = ((boxes[:, 3:] - boxes[:, :3]) / 1000.0).T
         
         # Solid Box Inertia Formula
-        ixx = (1/12.0) * mass_kg * (dy**2 + dz**2)
-        iyy = (1/12.0) * mass_kg * (dx**2 + dz**2)
-        izz = (1/12.0) * mass_kg * (dx**2 + dy**2)
+        ixx = (1/12.0) * masses * (dy**2 + dz**2)
+        iyy = (1/12.0) * masses * (dx**2 + dz**2)
+        izz = (1/12.0) * masses * (dx**2 + dy**2)
         
-        return f'<inertia ixx="{ixx:.8f}" ixy="0" ixz="0" iyy="{iyy:.8f}" iyz="0" izz="{izz:.8f}"/>'
+        return [f'<inertia ixx="{xx:.8f}" ixy="0" ixz="0" iyy="{yy:.8f}" iyz="0" izz="{zz:.8f}"/>'
+                for xx, yy, zz in zip(ixx, iyy, izz)]
 
     def export(self, output_dir="static/urdf_test"):
         print(f"   📂 Exporting Simulation Assets to: {output_dir}")
@@ -37,51 +148,58 @@ class URDFExporter:
         # --- 1. GENERATE BASE LINK (Static Parts) ---
         print("   🔨 fusing_base_link...")
         
-        # Frame
-        from app.cad.frame import FrameGenerator
-        frame = FrameGenerator(self.specs).generate()
+        # Frame (same resolved inputs as FrameGenerator.cache_key)
+        fg = FrameGenerator(self.specs)
+        frame = _frame_cached(fg.wb, fg.motor_mount, fg.stack_mount, fg.thick)
         
         # Stack (Center)
-        from app.cad.components import FlightControllerStack, Battery, Motor
-        stack = FlightControllerStack().build().translate((0,0,2))
-        battery = Battery().build().translate((0,0,25))
+        stack = _stack_cached().translate((0,0,2))
+        battery = _battery_cached().translate((0,0,25))
         
         # Motors (Static Bases)
-        motor_proto = Motor(mounting_mm=self.assembler.motor_mount).build()
+        motor_proto = _motor_cached(self.assembler.motor_mount)
         motor_z = self.assembler.arm_thick
         
-        # Fuse Everything
-        base_link = frame.union(stack).union(battery)
-        
         offsets = [
             (self.assembler.offset, self.assembler.offset),
             (self.assembler.offset, -self.assembler.offset),
             (-self.assembler.offset, self.assembler.offset),
             (-self.assembler.offset, -self.assembler.offset)
         ]
-        
-        for x, y in offsets:
-            m = motor_proto.translate((x, y, motor_z))
-            base_link = base_link.union(m)
+        motors = [motor_proto.translate((x, y, motor_z)) for x, y in offsets]
+
+        # Group Everything: meshing and bounding boxes only need the faces, so a
+        # loose compound replaces six successive boolean fuses
+        solids = [shape for part in (frame, stack, battery, *motors) for shape in part.vals()]
+        base_link = cq.Workplane("XY").add(cq.Compound.makeCompound(solids))
 
-        # Export Base Mesh
-        base_stl = os.path.join(output_dir, "base.stl")
-        cq.exporters.export(base_link, base_stl)
-        
         # Calc Base Mass (kg)
         base_mass_kg = 0.450 # 450g Frame+Electronics
-        base_inertia = self._get_inertia_xml(base_link, base_mass_kg)
+        # Box from the per-part boxes (cached with the parts), not another
+        # traversal of the whole compound
+        base_bounds = _merge_bounds([
+            (_bounds(frame), (0, 0, 0)),
+            (_bounds(_stack_cached()), (0, 0, 2)),
+            (_bounds(_battery_cached()), (0, 0, 25)),
+            *((_bounds(motor_proto), (x, y, motor_z)) for x, y in offsets),
+        ])
 
         # --- 2. GENERATE PROP LINK (Moving Parts) ---
         print("   💨 generating_propellers...")
-        from app.cad.components import Propeller
-        prop_shape = Propeller(diameter_inch=self.assembler.prop_diam).build()
+        prop_shape = _prop_cached(self.assembler.prop_diam)
         
+        prop_mass_kg = 0.004 # 4g per prop
+
+        # Inertia for every link in one vectorized pass (base, then one per prop)
+        prop_bounds = _bounds(prop_shape)
+        base_inertia, *prop_inertias = self._get_inertia_xml(
+            [base_bounds] + [prop_bounds] * 4, [base_mass_kg] + [prop_mass_kg] * 4)
+
+        # Export Meshes
+        base_stl = os.path.join(output_dir, "base.stl")
         prop_stl = os.path.join(output_dir, "prop.stl")
+        cq.exporters.export(base_link, base_stl)
         cq.exporters.export(prop_shape, prop_stl)
-        
-        prop_mass_kg = 0.004 # 4g per prop
-        prop_inertia = self._get_inertia_xml(prop_shape, prop_mass_kg)
 
         # --- 3. WRITE URDF XML ---
         print("   📝 writing_urdf_definition...")
@@ -91,33 +209,8 @@ class URDFExporter:
         
         # CRITICAL FIX: scale="0.001 0.001 0.001"
         # This tells PyBullet: "The STL is in mm, please shrink it to meters"
-        urdf_content = f"""<?xml version="1.0"?>
-<robot name="{project_name}">
-
-  <link name="base_link">
-    <inertial>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
-      <mass value="{base_mass_kg}"/>
-      {base_inertia}
-    </inertial>
-    <visual>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
-      <geometry>
-        <mesh filename="base.stl" scale="0.001 0.001 0.001"/> 
-      </geometry>
-      <material name="grey">
-        <color rgba="0.2 0.2 0.2 1.0"/>
-      </material>
-    </visual>
-    <collision>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
-      <geometry>
-        <mesh filename="base.stl" scale="0.001 0.001 0.001"/>
-      </geometry>
-    </collision>
-  </link>
+        parts = [URDF_HEADER_TMPL.format(project_name=project_name, base_mass_kg=base_mass_kg, base_inertia=base_inertia)]
 
-"""
         prop_names = ["prop_fl", "prop_fr", "prop_rl", "prop_rr"]
         locs = [
             (self.assembler.offset, self.assembler.offset),   # FL
@@ -125,46 +218,16 @@ class URDFExporter:
             (-self.assembler.offset, self.assembler.offset),  # RL
             (-self.assembler.offset, -self.assembler.offset)  # RR
         ]
+        prop_radius_m = self.assembler.prop_diam * 0.0254 / 2
 
-        for i, name in enumerate(prop_names):
-            x, y = locs[i]
-            
+        for name, (x, y), prop_inertia in zip(prop_names, locs, prop_inertias):
             # Convert joint location to METERS
             pos_str = f"{x/1000.0} {y/1000.0} {joint_z/1000.0}"
-            
-            urdf_content += f"""
-  <link name="{name}">
-    <inertial>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
-      <mass value="{prop_mass_kg}"/>
-      {prop_inertia}
-    </inertial>
-    <visual>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
-      <geometry>
-        <mesh filename="prop.stl" scale="0.001 0.001 0.001"/>
-      </geometry>
-      <material name="cyan">
-        <color rgba="0 0.8 0.8 1.0"/>
-      </material>
-    </visual>
-    <collision>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
-      <geometry>
-        <cylinder length="0.01" radius="{self.assembler.prop_diam * 0.0254 / 2}"/>
-      </geometry>
-    </collision>
-  </link>
-
-  <joint name="joint_{name}" type="continuous">
-    <parent link="base_link"/>
-    <child link="{name}"/>
-    <origin rpy="0 0 0" xyz="{pos_str}"/>
-    <axis xyz="0 0 1"/>
-  </joint>
-"""
+            parts.append(PROP_LINK_TMPL.format(name=name, prop_mass_kg=prop_mass_kg, prop_inertia=prop_inertia, prop_radius_m=prop_radius_m))
+            parts.append(PROP_JOINT_TMPL.format(name=name, pos=pos_str))
 
-        urdf_content += "</robot>"
+        parts.append("</robot>")
+        urdf_content = "".join(parts)
 
         urdf_path = os.path.join(output_dir, "drone.urdf")
         with open(urdf_path, "w") as f:
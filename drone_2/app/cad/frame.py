@@ -1,5 +1,19 @@
 import cadquery as cq
 import math
+import os
+import json
+import shutil
+import hashlib
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+CACHE_DIR = os.path.join(PROJECT_ROOT, "output", "cache")
+# Bump whenever generate() changes shape so stale cached meshes are ignored.
+GEOMETRY_VERSION = 2
+
+# True-X geometry constants (evaluated once at import)
+COS_45 = math.cos(math.radians(45))
+CORNER_SIGNS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
 
 class FrameGenerator:
     """
@@ -23,85 +37,76 @@ class FrameGenerator:
         self.shape = None
         self.color = (0.1, 0.1, 0.1) # Carbon Fiber Black
 
+    @property
+    def cache_key(self):
+        """Content hash of the resolved geometry inputs (identical specs -> identical frame)."""
+        params = {
+            "version": GEOMETRY_VERSION,
+            "wheelbase_mm": self.wb,
+            "motor_mount_mm": self.motor_mount,
+            "stack_mount_mm": self.stack_mount,
+            "arm_thickness_mm": self.thick,
+        }
+        blob = json.dumps(params, sort_keys=True).encode()
+        return hashlib.blake2b(blob).hexdigest()[:16]
+
     def generate(self):
-        """Builds the geometry."""
+        """
+        Builds the geometry.
+        The frame is a flat plate with through-holes (2.5D), so it is drawn as
+        a single 2D profile and extruded once -- no 3D union/cut booleans.
+        """
         
         # 1. Calculate Arm Geometry
         # In a True-X, the arm angle is 45 degrees.
         # Distance from center to motor shaft = Wheelbase / 2
         radius = self.wb / 2.0
         
-        # 2. Create the Center Bus (Main Body)
+        # 2. Center Bus (Main Body)
         # Size it to fit the stack + some protection
         body_w = self.stack_mount + 20
-        center_plate = (
-            cq.Workplane("XY")
-            .box(body_w, body_w, 2.0) # Top/Bottom plates are usually 2mm
-        )
 
-        # 3. Create One Arm (The "Template")
-        # We model the arm pointing EAST (0 degrees), then rotate it.
+        # 3. Arm Profile
+        # Each arm starts at the origin and points along its diagonal, so its
+        # rectangle is centered half an arm length out. The X is symmetric
+        # about both axes: mirror the 45 deg arm into each quadrant (a
+        # rectangle turned by -45 is the same as one turned by 135/315).
         arm_len = radius + 15 # Extend past motor for bumper protection
         arm_width = max(10, self.motor_mount - 2) # Adaptive width
+        arm_reach = arm_len/2 * COS_45
+        arm_locs = [
+            cq.Location(cq.Vector(sx * arm_reach, sy * arm_reach, 0), cq.Vector(0, 0, 1), 45 * sx * sy)
+            for sx, sy in CORNER_SIGNS
+        ]
         
-        arm = (
-            cq.Workplane("XY")
-            .box(arm_len, arm_width, self.thick)
-            .translate((arm_len/2, 0, 0)) # Shift so origin is at one end
-        )
-        
-        # 4. Pattern the Arms (The "X" Shape)
-        # We need 4 arms at 45, 135, 225, 315 degrees
-        arms = (
-            arm.rotate((0,0,0), (0,0,1), 45)
-            .union(arm.rotate((0,0,0), (0,0,1), 135))
-            .union(arm.rotate((0,0,0), (0,0,1), 225))
-            .union(arm.rotate((0,0,0), (0,0,1), 315))
-        )
-        
-        # Fuse Arms to Center Plate
-        frame = center_plate.union(arms)
-        
-        # 5. The Drilling Operation (Subtractive Manufacturing)
-        
-        # A. Stack Holes (Center)
-        stack_holes = (
-            cq.Workplane("XY")
-            .rect(self.stack_mount, self.stack_mount, forConstruction=True)
-            .vertices()
-            .circle(1.6) # M3 screw clearance
-            .extrude(100) # Cut through everything
-        )
-        frame = frame.cut(stack_holes)
-        
-        # B. Motor Holes (Tips of Arms)
-        # We need to calculate the (X,Y) coords of the 4 motors
+        # 4. Hole Positions
+        # A. Motor Positions (Tips of Arms)
         # x = radius * cos(45), y = radius * sin(45)
-        offset = radius * 0.70710678 # cos(45)
+        offset = radius * COS_45
+        motor_centers = [(offset * sx, offset * sy) for sx, sy in CORNER_SIGNS]
         
-        # Create a drilling tool at the motor position
-        motor_drill = (
+        # B. Screw Holes: Stack (Center) + Motor Bolt Pattern at each tip
+        half_stack = self.stack_mount / 2.0
+        half_motor = self.motor_mount / 2.0
+        screw_points = [(sx * half_stack, sy * half_stack) for sx, sy in CORNER_SIGNS]
+        screw_points += [
+            (cx + sx * half_motor, cy + sy * half_motor)
+            for cx, cy in motor_centers
+            for sx, sy in CORNER_SIGNS
+        ]
+
+        # 5. Sketch the Unibody Profile & Extrude
+        frame = (
             cq.Workplane("XY")
-            .rect(self.motor_mount, self.motor_mount, forConstruction=True)
-            .vertices()
-            .circle(1.6) # M3 screw hole
-            .extrude(100)
+            .sketch()
+            .rect(body_w, body_w)
+            .push(arm_locs).rect(arm_len, arm_width).reset()
+            .push(screw_points).circle(1.6, mode="s").reset() # M3 screw clearance
+            .push(motor_centers).circle(3.0, mode="s").reset() # 6mm hole for shaft
+            .clean()
+            .finalize()
+            .extrude(self.thick)
         )
-        
-        # Apply drill to all 4 corners
-        for x_mod in [1, -1]:
-            for y_mod in [1, -1]:
-                driller = motor_drill.translate((offset * x_mod, offset * y_mod, 0))
-                frame = frame.cut(driller)
-                
-                # C. Motor Center Hole (Shaft/Clip clearance)
-                center_drill = (
-                    cq.Workplane("XY")
-                    .circle(3.0) # 6mm diameter hole for shaft
-                    .extrude(100)
-                    .translate((offset * x_mod, offset * y_mod, 0))
-                )
-                frame = frame.cut(center_drill)
 
         # 6. Final Polish (Fillets)
         # Filleting complex unions can be fragile in CAD kernels. 
@@ -112,8 +117,22 @@ class FrameGenerator:
         return self.shape
 
     def export_stl(self, filename):
-        if self.shape:
-            cq.exporters.export(self.shape, filename)
+        """
+        Writes the frame STL, reusing a previously exported mesh for the same specs.
+        On a cache hit the CAD kernel is never touched (no generate() needed).
+        """
+        cached_path = os.path.join(CACHE_DIR, f"frame_{self.cache_key}.stl")
+        if os.path.exists(cached_path):
+            shutil.copyfile(cached_path, filename)
+            return filename
+
+        if self.shape is None:
+            self.generate()
+        cq.exporters.export(self.shape, filename)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        shutil.copyfile(filename, cached_path)
+        return filename
 
 # --- TEST HARNESS ---
 if __name__ == "__main__":
@@ -128,7 +147,6 @@ if __name__ == "__main__":
     }
     
     fg = FrameGenerator(specs)
-    fg.generate()
     fg.export_stl("test_frame.stl")
     
     print(f"✅ Frame Generated: Wheelbase={specs['wheelbase_mm']}mm")
@@ -21,6 +21,12 @@ class Settings:
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
     GOOGLE_SEARCH_ENGINE_ID: str = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
     
+    # LLM prompts: "compact" (default) or "verbose" (original wording, kept for A/B runs)
+    PROMPT_VARIANT: str = os.getenv("PROMPT_VARIANT", "compact")
+    
+    # Scraped product pages persist here across restarts (needs diskcache)
+    SCRAPE_CACHE_DIR: str = os.getenv("SCRAPE_CACHE_DIR", "/tmp/drones_scrape")
+    
     # Celery / Redis
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
@@ -1,63 +1,189 @@
 # FILE: main.py
 import asyncio
-import sys
 import os
-import json
+import re
+import io
 import base64
+import hashlib
+import functools
 import webbrowser
-import random
 import shutil
-import subprocess
 from datetime import datetime
-
-# Import Services
-from app.services.ai_service import (
-    analyze_user_requirements, refine_requirements, 
-    generate_spec_sheet, generate_assembly_instructions
-)
-from app.services.fusion_service import fuse_component_data
-from app.services.physics_service import run_physics_simulation
-from app.services.cad_service import generate_assets
-from app.services.cost_service import generate_procurement_manifest
-from app.services.schematic_service import generate_wiring_diagram
+import numpy as np
+import orjson
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: fall back to running the kernels as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]): return args[0]
+        return lambda fn: fn
 
 OUTPUT_DIR = os.path.abspath("output")
 TEMPLATE_DIR = os.path.abspath("templates")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+SOURCING_CONCURRENCY = 5
 
+# cad_service part names -> the flat asset keys the dashboard/manifest use
+CAD_PART_KEYS = {
+    "Frame_Kit": "frame",
+    "Motors": "motor",
+    "FC_Stack": "fc",
+    "Propellers": "prop",
+    "Battery": "battery",
+    "Camera_VTX_Kit": "camera",
+}
+
+@functools.lru_cache(maxsize=1)
 def check_openscad():
-    try:
-        subprocess.run(["openscad", "-v"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return True
-    except: return False
+    # Only need to know the binary is on PATH; no need to fork OpenSCAD for that
+    return shutil.which("openscad") is not None
+
+PLACEHOLDER_STL = (
+    b"solid placeholder\nfacet normal 0 0 1\nouter loop\n"
+    b"vertex 0 0 0\nvertex 10 0 0\nvertex 0 10 0\n"
+    b"endloop\nendfacet\nendsolid placeholder"
+)
 
 def create_placeholder_stl(filepath):
-    with open(filepath, "w") as f:
-        f.write(f"solid placeholder\nfacet normal 0 0 1\nouter loop\nvertex 0 0 0\nvertex 10 0 0\nvertex 0 10 0\nendloop\nendfacet\nendsolid placeholder")
+    with open(filepath, "wb") as f:
+        f.write(PLACEHOLDER_STL)
     return filepath
 
+B64_CHUNK = 48 * 1024 # Multiple of 3, so chunks encode without mid-stream padding
+
 def file_to_b64(path):
+    """
+    Inline data: URI for an STL. The CLI opens the dashboard over file://,
+    where the page cannot fetch sibling files, so meshes travel inside it.
+    """
     if not path or not os.path.exists(path): return ""
     try:
-        with open(path, "rb") as f: return f"data:model/stl;base64,{base64.b64encode(f.read()).decode('utf-8')}"
-    except: return ""
+        # Encode chunk-by-chunk straight into the output buffer instead of
+        # holding the raw file AND its encoding in memory at once.
+        out = bytearray(b"data:model/stl;base64,")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(B64_CHUNK), b""):
+                out += base64.b64encode(chunk)
+        return out.decode('ascii')
+    except OSError: return ""
+
+@njit(cache=True)
+def _integrate_hover(hover, noise):
+    """
+    Sequential altitude-hold recurrence (h[i] depends on h[i-1]).
+    JIT-compiled by numba (cached on disk) since the loop can't be vectorized.
+    """
+    heights = np.empty(noise.shape[0])
+    throttles = np.empty(noise.shape[0])
+    h = 0.0
+    for i in range(noise.shape[0]):
+        th = hover + (1.5 - h) * 0.5 + noise[i]
+        th = min(1.0, max(0.0, th))
+        h += (th - hover) * 2.0
+        if h < 0.0: h = 0.0
+        heights[i] = h
+        throttles[i] = th
+    return heights, throttles
 
-def generate_flight_log(report):
+def warm_kernels():
+    """Compiles (or loads from the numba cache) _integrate_hover ahead of the first flight log."""
+    _integrate_hover(0.5, np.zeros(1))
+
+def generate_flight_log(report, steps=100):
     twr = report.get('twr', 1.0)
     hover = report.get('hover_throttle_percent', 50) / 100.0
-    times, heights, throttles = [], [], []
-    h = 0
-    for i in range(100):
-        times.append(i/10.0)
-        err = 1.5 - h
-        th = hover + (err * 0.5) if twr > 1.0 else 1.0
-        th = max(0, min(1, th + (random.random()-0.5)*0.05))
-        h += (th - hover) * 2.0 if twr > 1.0 else -0.5
-        if h < 0: h = 0
-        heights.append(round(h, 2)); throttles.append(round(th, 2))
-    return {"time": times, "height": heights, "throttle_avg": throttles}
+    times = np.arange(steps) / 10.0
+    noise = np.random.default_rng().uniform(-0.025, 0.025, steps)
+    if twr > 1.0:
+        heights, throttles = _integrate_hover(hover, noise)
+    else:
+        # Can't lift off: pinned at full throttle, never leaves the ground
+        heights = np.zeros(steps)
+        throttles = np.clip(1.0 + noise, 0.0, 1.0)
+    return {
+        "time": times.tolist(),
+        "height": np.round(heights, 2).tolist(),
+        "throttle_avg": np.round(throttles, 2).tolist(),
+    }
+
+def spec_hash(data):
+    """Short, stable content hash of a JSON-able spec dict."""
+    return hashlib.blake2b(orjson.dumps(data, option=orjson.OPT_SORT_KEYS), digest_size=6).hexdigest()
+
+def load_cached_assets(manifest_path):
+    """Asset map from a previous run with identical specs, if all its files still exist."""
+    if not os.path.exists(manifest_path): return None
+    try:
+        with open(manifest_path, "rb") as f: assets = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError): return None
+    for k, v in assets.items():
+        if isinstance(v, str) and k != "assembly_scad" and not os.path.exists(v): return None
+    return assets
+
+def to_json(obj):
+    """Compact JSON text for embedding in the dashboard (orjson, numpy-aware)."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+# Matches "[[NAME_B64]]" (quoted string slot) or a bare [[NAME]] token
+TEMPLATE_TOKEN = re.compile(r'"\[\[([A-Z_]+_B64)\]\]"|\[\[([A-Z_]+)\]\]')
+
+@functools.lru_cache(maxsize=None)
+def load_template(name):
+    """Reads a template from TEMPLATE_DIR once; later renders reuse the cached text."""
+    with open(os.path.join(TEMPLATE_DIR, name), "r", encoding="utf-8") as f: return f.read()
+
+@functools.lru_cache(maxsize=None)
+def compile_template(name):
+    """
+    Splits a template once into its static segments and the [[TOKEN]] slots
+    between them: segments[i] is followed by slots[i], then segments[-1].
+    """
+    html = load_template(name)
+    segments, slots, pos = [], [], 0
+    for m in TEMPLATE_TOKEN.finditer(html):
+        segments.append(html[pos:m.start()])
+        slots.append((m.group(1) or m.group(2), m.group(1) is not None, m.group(0)))
+        pos = m.end()
+    segments.append(html[pos:])
+    return tuple(segments), tuple(slots)
+
+def render_template(name, values):
+    """
+    Interleaves the pre-split template with the slot values into one buffer:
+    a single O(n) assembly, no per-placeholder copies or rescans.
+    Unknown tokens are written back as-is.
+    """
+    segments, slots = compile_template(name)
+    out = io.StringIO()
+    for segment, (key, quoted, raw) in zip(segments, slots):
+        out.write(segment)
+        if key not in values: out.write(raw)
+        elif quoted: out.writelines(('"', values[key], '"'))
+        else: out.write(values[key])
+    out.write(segments[-1])
+    return out.getvalue()
+
+def write_html(path, html):
+    """Writes the page, encoded once, with a single binary write."""
+    with open(path, "wb") as f: f.write(html.encode("utf-8"))
 
 async def run():
+    # Import Services
+    # Deferred to here: they pull in genai, Playwright, trimesh, etc., which
+    # importing this module (or a quick CLI exit) shouldn't have to pay for.
+    from app.services.ai_service import (
+        analyze_user_requirements, refine_and_spec, generate_assembly_instructions
+    )
+    from app.services.fusion_service import fuse_component_data
+    from app.services.physics_service import run_physics_simulation, warm_kernels as warm_physics
+    from app.services.cad_service import generate_assets_async, warm_kernels as warm_cad
+    from app.services.cost_service import generate_procurement_manifest
+
+    # JIT kernels compile (or load from the numba cache) here, before the
+    # interview, rather than at import or mid-build
+    for warm in (warm_kernels, warm_physics, warm_cad): warm()
+
     print("\n🚀 OPENFORGE SYSTEM ONLINE")
     print("==========================")
     
@@ -99,21 +225,33 @@ async def run():
     master_record["requirements"]["user_answers"] = answers
 
     # 3. Planning
-    plan = await refine_requirements(analysis, answers)
+    # (refinement and the spec sheet come back from one LLM call)
+    plan, specs = await refine_and_spec(analysis, answers)
+    plan, specs = plan or {}, specs or {}
     print(f"\n✅ Plan Approved: {plan.get('build_summary')}")
     master_record["engineering"]["final_plan"] = plan
 
     # 4. Execution
-    specs = await generate_spec_sheet(plan)
     master_record["engineering"]["spec_sheet"] = specs
     
     bom = []
     cad_data = {}
     
     print("\n🔎 Sourcing Components...")
-    for item in specs.get('buy_list', []):
-        print(f"   > Finding {item['part_type']}...")
-        part = await fuse_component_data(item['part_type'], item['search_query'])
+    buy_list = specs.get('buy_list', [])
+    sem = asyncio.Semaphore(SOURCING_CONCURRENCY) # Don't flood search/LLM APIs
+
+    async def source(item):
+        async with sem:
+            print(f"   > Finding {item['part_type']}...")
+            return await fuse_component_data(item['part_type'], item['search_query'])
+
+    parts = await asyncio.gather(*[source(item) for item in buy_list], return_exceptions=True)
+
+    for item, part in zip(buy_list, parts):
+        if isinstance(part, Exception):
+            print(f"     ❌ Error sourcing {item['part_type']}: {part}")
+            part = None
         if part:
             bom.append(part)
             s = part.get('engineering_specs', {})
@@ -126,6 +264,11 @@ async def run():
             
     master_record["sourcing"]["bill_of_materials"] = bom
 
+    # Docs only need the BOM, so start them now and let them overlap with CAD
+    guide_task = asyncio.create_task(generate_assembly_instructions(
+        {"bill_of_materials": bom, "engineering_notes": specs.get("engineering_notes")}
+    ))
+
     # 5. Physics & CAD
     print("\n🧪 Simulating Physics & Geometry...")
     phys = run_physics_simulation(bom)
@@ -140,47 +283,70 @@ async def run():
         
     master_record["fabrication"]["specs"] = cad_data
         
-    assets = generate_assets("mission", cad_data)
+    # Assets are named by a hash of the CAD specs (and the BOM specs the
+    # meshes are built from), so an identical re-run reuses the previous
+    # meshes instead of regenerating and rewriting them.
+    asset_tag = f"mission_{spec_hash({'cad': cad_data, 'parts': [p.get('engineering_specs', {}) for p in bom]})}"
+    manifest_path = os.path.join(OUTPUT_DIR, f"{asset_tag}_assets.json")
+    assets = load_cached_assets(manifest_path)
     
-    # Fallbacks
-    for k, v in assets.items():
-        if isinstance(v, str) and (not v or not os.path.exists(v)) and k != "assembly_scad":
-            path = os.path.join(OUTPUT_DIR, f"mission_{k}.stl")
-            assets[k] = create_placeholder_stl(path)
+    if assets is not None:
+        print("   ♻️  CAD specs unchanged. Reusing cached assets.")
+    else:
+        # Renders are asyncio subprocesses, so the docs task keeps making progress meanwhile.
+        # The CLI has no assembly blueprint: only the meshes are needed here.
+        cad = await generate_assets_async(asset_tag, {}, bom)
+        parts = cad["individual_parts"]
+        assets = {key: parts.get(name) for name, key in CAD_PART_KEYS.items()}
+        assets["assembly_scad"] = cad["assembly_files"].get("scad")
+        assets["wheelbase"] = cad["calculated_specs"].get("wheelbase", cad_data["wheelbase"])
+        
+        # Fallbacks
+        used_placeholder = False
+        for k in CAD_PART_KEYS.values():
+            v = assets[k]
+            if not v or not os.path.exists(v):
+                path = os.path.join(OUTPUT_DIR, f"{asset_tag}_{k}.stl")
+                assets[k] = create_placeholder_stl(path)
+                used_placeholder = True
+        
+        # Never cache placeholders: a later run with OpenSCAD should render for real
+        if not used_placeholder:
+            with open(manifest_path, "wb") as f: f.write(orjson.dumps(assets))
             
     master_record["fabrication"]["assets"] = assets
 
     # 6. Docs
     print("\n📝 Finalizing Documentation...")
-    guide = await generate_assembly_instructions({"bill_of_materials": bom, "engineering_notes": specs.get("engineering_notes")})
+    guide = await guide_task
     cost = generate_procurement_manifest(bom)
     
     master_record["documentation"]["assembly_guide"] = guide
     master_record["documentation"]["procurement"] = cost
     
     # 7. Render
-    with open(os.path.join(TEMPLATE_DIR, "dashboard.html"), "r") as f: html = f.read()
-    
-    html = html.replace('"[[FRAME_B64]]"', f'"{file_to_b64(assets.get("frame"))}"')
-    html = html.replace('"[[MOTOR_B64]]"', f'"{file_to_b64(assets.get("motor"))}"')
-    html = html.replace('"[[FC_B64]]"', f'"{file_to_b64(assets.get("fc"))}"')
-    html = html.replace('"[[PROP_B64]]"', f'"{file_to_b64(assets.get("prop"))}"')
-    html = html.replace('"[[BATTERY_B64]]"', f'"{file_to_b64(assets.get("battery"))}"')
-    html = html.replace('"[[CAMERA_B64]]"', f'"{file_to_b64(assets.get("camera"))}"')
-    html = html.replace('[[WHEELBASE]]', str(assets.get("wheelbase", 200)))
-    html = html.replace('[[STEPS_JSON]]', json.dumps(guide.get("steps", [])))
-    html = html.replace('[[PHYSICS_JSON]]', json.dumps(phys))
-    html = html.replace('[[COST_JSON]]', json.dumps(cost))
-    html = html.replace('[[FLIGHT_LOG_JSON]]', json.dumps(flight_log))
+    html = render_template("dashboard.html", {
+        "FRAME_B64": file_to_b64(assets.get("frame")),
+        "MOTOR_B64": file_to_b64(assets.get("motor")),
+        "FC_B64": file_to_b64(assets.get("fc")),
+        "PROP_B64": file_to_b64(assets.get("prop")),
+        "BATTERY_B64": file_to_b64(assets.get("battery")),
+        "CAMERA_B64": file_to_b64(assets.get("camera")),
+        "WHEELBASE": str(assets.get("wheelbase", 200)),
+        "STEPS_JSON": to_json(guide.get("steps", [])),
+        "PHYSICS_JSON": to_json(phys),
+        "COST_JSON": to_json(cost),
+        "FLIGHT_LOG_JSON": to_json(flight_log),
+    })
     
     out_path = os.path.join(OUTPUT_DIR, "dashboard.html")
-    with open(out_path, "w") as f: f.write(html)
+    write_html(out_path, html)
     
     # Save FULL Record
     json_path = os.path.join(OUTPUT_DIR, "master_record.json")
     print(f"\n💾 SAVING SOURCE OF TRUTH: {json_path}")
-    with open(json_path, "w") as f:
-        json.dump(master_record, f, indent=2)
+    with open(json_path, "wb") as f:
+        f.write(orjson.dumps(master_record, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
     print(f"\n🚀 Done. Dashboard: {out_path}")
     webbrowser.open(f"file://{out_path}")
@@ -0,0 +1,56 @@
+# FILE: app/prompts/__init__.py
+#
+# System instructions live next to this file as plain .txt (one per prompt).
+# They are read from disk on first use and cached, so importing app.prompts
+# does not build every multi-KB prompt string up front.
+#
+# The top-level files are the compact (token-trimmed) wording. The original
+# long-form text of the trimmed ones lives in verbose/ and is used instead
+# when settings.PROMPT_VARIANT == "verbose", for A/B regression runs.
+import functools
+from pathlib import Path
+from app.config import settings
+
+PROMPT_DIR = Path(__file__).parent
+VERBOSE_DIR = PROMPT_DIR / "verbose"
+
+PROMPT_NAMES = (
+    # SECTION 1: CORE ARCHITECTURE & USER INTENT
+    "REQUIREMENTS_SYSTEM_INSTRUCTION",
+    "SYSTEM_ARCHITECT_INSTRUCTION",
+    "REFINE_AND_SPEC_INSTRUCTION",
+    # SECTION 2: ROBOTICS & SOFTWARE INTELLIGENCE
+    "SOFTWARE_ARCHITECT_INSTRUCTION",
+    # SECTION 3: SOURCING & ARSENAL GENERATION (THE "NIGHT SHIFT")
+    "RANCHER_PERSONA_INSTRUCTION",
+    "ARSENAL_ENGINEER_INSTRUCTION",
+    "ARSENAL_SCOUT_INSTRUCTION",
+    "ARSENAL_SOURCER_INSTRUCTION",
+    "SPEC_GENERATOR_INSTRUCTION",
+    # SECTION 4: VISION INTELLIGENCE (VERIFICATION)
+    "VISION_PROMPT_ENGINEER_INSTRUCTION",
+    # SECTION 5: VALIDATION & ENGINEERING (THE "DAY SHIFT")
+    "ASSEMBLY_BLUEPRINT_INSTRUCTION",
+    "OPTIMIZATION_ENGINEER_INSTRUCTION",
+    "ASSEMBLY_GUIDE_INSTRUCTION",
+    "CONSTRAINT_MERGER_INSTRUCTION",
+    "HUMAN_INTERACTION_PROMPT",
+)
+
+__all__ = ["load_prompt", *PROMPT_NAMES]
+
+@functools.lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """Returns the text of a system instruction, e.g. load_prompt("SPEC_GENERATOR_INSTRUCTION")."""
+    if name not in PROMPT_NAMES:
+        raise KeyError(f"Unknown prompt: {name}")
+    filename = f"{name.lower()}.txt"
+    if settings.PROMPT_VARIANT == "verbose" and (VERBOSE_DIR / filename).exists():
+        return (VERBOSE_DIR / filename).read_text(encoding="utf-8")
+    return (PROMPT_DIR / filename).read_text(encoding="utf-8")
+
+def __getattr__(name):
+    # Keeps `from app.prompts import SOME_INSTRUCTION` working (loaded on access)
+    if name in PROMPT_NAMES:
+        return load_prompt(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
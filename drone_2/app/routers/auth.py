@@ -1,8 +1,9 @@
 #
 # FILE: app/routers/auth.py
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, bindparam
 from datetime import datetime, timedelta
 from jose import jwt
 from passlib.context import CryptContext
@@ -11,21 +12,42 @@ from app.models import User
 from app.config import settings
 
 router = APIRouter(tags=["Authentication"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id (argon2-cffi, C) for new hashes, ~50 ms each; bcrypt is kept only to
+# verify legacy hashes, which are upgraded on the user's next login. Hashing is
+# CPU-bound, so it runs in a worker thread, not on the event loop.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"], deprecated="auto",
+    argon2__time_cost=2, argon2__memory_cost=19456, argon2__parallelism=1,
+)
+# Verified against when the username does not exist, so an unknown user costs
+# the same hash work as a wrong password (no account enumeration by timing).
+# It uses the slowest scheme still stored: while legacy bcrypt hashes remain,
+# an argon2 dummy would answer faster than a legacy account. Switch to
+# "argon2" once every user has logged in (and been rehashed) since the upgrade.
+DUMMY_HASH_SCHEME = "bcrypt"
+DUMMY_HASH = pwd_context.handler(DUMMY_HASH_SCHEME).hash("dummy-password")
+
+# --- ACCESS TOKENS ---
+# Resolved once at import instead of on every login
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    to_encode.update({"exp": datetime.utcnow() + ACCESS_TOKEN_EXPIRE})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+# Built once: every request reuses the same statement (and its compiled SQL)
+_SEL_USER_BY_NAME = select(User).where(User.username == bindparam("username")).limit(1)
 
 @router.post("/auth/signup")
 async def signup(username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.username == username))
-    if result.scalars().first():
+    result = await db.execute(_SEL_USER_BY_NAME, {"username": username})
+    if result.scalar_one_or_none() is not None:
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    hashed_pw = pwd_context.hash(password)
+    hashed_pw = await asyncio.to_thread(pwd_context.hash, password)
     user = User(username=username, hashed_password=hashed_pw)
     db.add(user)
     await db.commit()
@@ -33,10 +55,17 @@ async def signup(username: str = Form(...), password: str = Form(...), db: Async
 
 @router.post("/auth/login")
 async def login(username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalars().first()
-    if not user or not pwd_context.verify(password, user.hashed_password):
+    result = await db.execute(_SEL_USER_BY_NAME, {"username": username})
+    user = result.scalar_one_or_none()
+    # Always run exactly one verify, whether or not the user exists
+    password_ok, new_hash = await asyncio.to_thread(
+        pwd_context.verify_and_update, password, user.hashed_password if user else DUMMY_HASH)
+    if user is None or not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Legacy bcrypt (or outdated argon2 parameters): store the current scheme
+        user.hashed_password = new_hash
+        await db.commit()
     
     token = create_access_token({"sub": user.username})
     return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
@@ -1,34 +1,167 @@
 # FILE: app/services/ai_service.py
 import google.generativeai as genai
-import json
+import asyncio
+import functools
 import re
+import copy
+import hashlib
+import orjson
+from collections import OrderedDict
 from app.config import settings
-from app.prompts import *
+from app.prompts import load_prompt
 
 if settings.GOOGLE_API_KEY:
     genai.configure(api_key=settings.GOOGLE_API_KEY)
 
+def to_prompt_json(data, indent: bool = True) -> str:
+    """Serializes an LLM payload with orjson (C encoder, no GIL-heavy Python walk)."""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+
+MARKDOWN_JSON_RE = re.compile(r"```(json)?\s*({.*})\s*```", re.DOTALL)
+
 def parse_json_garbage(text: str) -> dict | None:
     if not text: return None
-    match = re.search(r"```(json)?\s*({.*})\s*```", text, re.DOTALL)
-    json_str = match.group(2) if match else text
-    if not match:
-        start, end = text.find("{"), text.rfind("}") + 1
-        if start != -1 and end != -1: json_str = text[start:end]
+    # 1. Fast path: with response_mime_type=application/json the body is
+    #    almost always clean JSON already.
     try:
-        return json.loads(json_str)
-    except:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
+    # 2. Outermost {...} slice (chatter around the object)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            return orjson.loads(text[start:end + 1])
+        except orjson.JSONDecodeError:
+            pass
+    # 3. Last resort: fenced ```json block
+    match = MARKDOWN_JSON_RE.search(text)
+    if match:
+        try:
+            return orjson.loads(match.group(2))
+        except orjson.JSONDecodeError:
+            pass
+    return None
+
+LLM_MODEL = 'gemini-2.5-pro'
+
+# One GenerativeModel per system instruction, reused across calls instead of
+# rebuilt per request
+@functools.lru_cache(maxsize=64)
+def _get_model(system_instruction: str) -> genai.GenerativeModel:
+    return genai.GenerativeModel(LLM_MODEL, system_instruction=system_instruction)
+
+# --- STREAMED RESPONSES ---
+# Large answers (spec sheets, assembly guides) are streamed and scanned as they
+# arrive; reading stops as soon as the outermost JSON object closes instead of
+# waiting for the tail of the response.
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+class JsonObjectScanner:
+    """Tracks brace depth across chunks (string- and escape-aware)."""
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.length = 0 # chars consumed so far
+
+    def feed(self, chunk: str) -> int | None:
+        """Returns the end offset of the outer object in the full text once it closes."""
+        for i, ch in enumerate(chunk):
+            if self.in_string:
+                if self.escaped: self.escaped = False
+                elif ch == "\\": self.escaped = True
+                elif ch == '"': self.in_string = False
+            elif ch == '"':
+                if self.started: self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return self.length + i + 1
+        self.length += len(chunk)
         return None
 
-async def call_llm_for_json(prompt: str, system_instruction: str) -> dict | None:
+async def _generate_json_text(model, prompt: str) -> str:
+    parts = []
+    try:
+        response = await model.generate_content_async(prompt, generation_config=JSON_GENERATION_CONFIG, stream=True)
+        scanner = JsonObjectScanner()
+        async for chunk in response:
+            text = chunk.text
+            parts.append(text)
+            end = scanner.feed(text)
+            if end is not None:
+                return "".join(parts)[:end]
+        return "".join(parts)
+    except Exception as e:
+        if parts:
+            # Output tokens were already paid for: use them if they parse,
+            # never silently re-issue the whole prompt
+            text = "".join(parts)
+            if parse_json_garbage(text) is not None:
+                print(f"   ⚠️ LLM stream failed ({e}) after a complete object. Using it.")
+                return text
+            raise
+        print(f"   ⚠️ LLM stream failed before any output ({e}). Retrying without streaming...")
+    response = await model.generate_content_async(prompt, generation_config=JSON_GENERATION_CONFIG)
+    return response.text
+
+# --- RESPONSE CACHE ---
+# Identical (system_instruction, prompt) pairs return the previously parsed
+# result instead of paying for another Gemini round-trip.
+LLM_CACHE_SIZE = 256
+LLM_CACHE_STATS = {"hits": 0, "misses": 0}
+_llm_cache: OrderedDict[str, dict] = OrderedDict()
+
+def _llm_cache_key(prompt: str, system_instruction: str) -> str:
+    return hashlib.blake2b(f"{system_instruction}\x1f{prompt}".encode("utf-8")).hexdigest()
+
+async def call_llm_for_json(prompt: str, system_instruction: str, use_cache: bool = True) -> dict | None:
+    key = _llm_cache_key(prompt, system_instruction)
+    if use_cache and key in _llm_cache:
+        _llm_cache.move_to_end(key)
+        LLM_CACHE_STATS["hits"] += 1
+        # Callers mutate what they get back, so never hand out the cached object
+        return copy.deepcopy(_llm_cache[key])
+    LLM_CACHE_STATS["misses"] += 1
+
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro', system_instruction=system_instruction)
-        response = await model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
-        return parse_json_garbage(response.text)
+        model = _get_model(system_instruction)
+        result = parse_json_garbage(await _generate_json_text(model, prompt))
     except Exception as e:
         print(f"LLM Error: {e}")
         return None
 
+    # Only successful parses are cached; a failure should be retried for real
+    if result is not None:
+        _llm_cache[key] = copy.deepcopy(result)
+        if len(_llm_cache) > LLM_CACHE_SIZE:
+            _llm_cache.popitem(last=False)
+    return result
+
+async def call_llm_for_json_batch(pairs: list[tuple[str, str]], max_concurrency: int = 8) -> list[dict | None]:
+    """
+    Runs many independent (prompt, system_instruction) calls concurrently.
+
+    Args:
+        pairs: (prompt, system_instruction) tuples.
+        max_concurrency: Upper bound on in-flight Gemini requests.
+
+    Returns:
+        Parsed results in the same order as `pairs` (None for failed calls).
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(prompt: str, system_instruction: str) -> dict | None:
+        async with sem:
+            return await call_llm_for_json(prompt, system_instruction)
+
+    return await asyncio.gather(*[_one(p, si) for p, si in pairs])
+
 async def generate_dynamic_buy_list(plan: dict) -> list[str] | None:
     """
     Uses the System Architect AI to generate a dynamic list of required part categories.
@@ -51,7 +184,7 @@ async def generate_dynamic_buy_list(plan: dict) -> list[str] | None:
 
     try:
         # We can't use the standard call_llm_for_json because this prompt returns a raw list, not an object.
-        model = genai.GenerativeModel('gemini-2.5-pro', system_instruction=SYSTEM_ARCHITECT_INSTRUCTION)
+        model = _get_model(load_prompt("SYSTEM_ARCHITECT_INSTRUCTION"))
         response = await model.generate_content_async(prompt_content, generation_config={"response_mime_type": "application/json"})
         
         # Parse the raw JSON list string
@@ -61,7 +194,7 @@ async def generate_dynamic_buy_list(plan: dict) -> list[str] | None:
         if raw_text.startswith("```json"):
             raw_text = raw_text[7:-3].strip()
         
-        component_list = json.loads(raw_text)
+        component_list = orjson.loads(raw_text)
 
         if isinstance(component_list, list):
             print(f"   ✅ System Architect determined {len(component_list)} component categories are needed.")
@@ -76,12 +209,50 @@ async def generate_dynamic_buy_list(plan: dict) -> list[str] | None:
 
 async def analyze_user_requirements(user_prompt: str) -> dict:
     print(f"--> 🧠 Architect Agent Analyzing...")
-    return await call_llm_for_json(user_prompt, REQUIREMENTS_SYSTEM_INSTRUCTION)
+    return await call_llm_for_json(user_prompt, load_prompt("REQUIREMENTS_SYSTEM_INSTRUCTION"))
+
+async def analyze_user_requirements_batch(user_prompts: list[str], max_concurrency: int = 8) -> list[dict | None]:
+    """Batch form of analyze_user_requirements for sweeps/evaluations; results keep input order."""
+    print(f"--> 🧠 Architect Agent Analyzing {len(user_prompts)} requests...")
+    instruction = load_prompt("REQUIREMENTS_SYSTEM_INSTRUCTION")
+    return await call_llm_for_json_batch([(p, instruction) for p in user_prompts], max_concurrency)
+
+async def refine_and_spec(original_analysis: dict, user_answers: list[str]) -> tuple[dict | None, dict | None]:
+    """
+    Refines the requirements and writes the sourcing spec sheet in a single
+    LLM round-trip (replaces refine_requirements -> generate_spec_sheet).
+
+    Args:
+        original_analysis: Output of analyze_user_requirements.
+        user_answers: "Q: ... | A: ..." strings from the clarification step.
+
+    Returns:
+        (final_plan, spec_sheet); either is None if the response lacks its part.
+    """
+    print(f"--> 🧠 Chief Engineer Refining & Sourcing Engineer generating search queries...")
+    context = to_prompt_json({"analysis": original_analysis, "answers": user_answers}, indent=False)
+    result = await call_llm_for_json(context, load_prompt("REFINE_AND_SPEC_INSTRUCTION"))
+    if not result:
+        print("   ❌ Combined refine/spec call failed.")
+        return None, None
+
+    final_plan = {k: result[k] for k in ("final_constraints", "build_summary", "approval_status") if k in result}
+    if original_analysis.get("topology"):
+        final_plan["topology"] = original_analysis["topology"]
+
+    specs = None
+    if isinstance(result.get("buy_list"), list):
+        specs = {"buy_list": result["buy_list"], "engineering_notes": result.get("engineering_notes", "")}
+        print(f"   ✅ Sourcing Engineer generated {len(specs['buy_list'])} search queries.")
+    else:
+        print("   ❌ Sourcing Engineer failed to generate a valid spec sheet.")
+    return final_plan or None, specs
 
 async def refine_requirements(original_analysis: dict, user_answers: list[str]) -> dict:
+    """Legacy: prefer refine_and_spec, which also returns the spec sheet in the same call."""
     print(f"--> 🧠 Chief Engineer Refining...")
-    context = f"ANALYSIS:\n{json.dumps(original_analysis)}\nANSWERS:\n{json.dumps(user_answers)}"
-    final_plan = await call_llm_for_json(context, CONSTRAINT_MERGER_INSTRUCTION)
+    context = to_prompt_json({"analysis": original_analysis, "answers": user_answers}, indent=False)
+    final_plan = await call_llm_for_json(context, load_prompt("CONSTRAINT_MERGER_INSTRUCTION"))
     
     # --- THE FIX: Inject Topology back into plan ---
     if final_plan and original_analysis.get("topology"):
@@ -91,6 +262,9 @@ async def refine_requirements(original_analysis: dict, user_answers: list[str])
 
 async def generate_spec_sheet(plan: dict, dynamic_buy_list: list[str]) -> dict | None:
     """
+    Legacy: the initial plan -> spec sheet step now runs inside refine_and_spec.
+    Still used to re-plan with a 'forced_anchor'.
+
     Uses the Sourcing Engineer AI to generate search queries for a dynamic list of parts.
 
     This function is now simpler in its goal but more complex in its context,
@@ -117,10 +291,10 @@ async def generate_spec_sheet(plan: dict, dynamic_buy_list: list[str]) -> dict |
 
 
     # 2. Format the context into a JSON string for the prompt
-    prompt_content = json.dumps(prompt_context, indent=2)
+    prompt_content = to_prompt_json(prompt_context)
 
     # 3. Call the LLM with the new prompt and context
-    specs = await call_llm_for_json(prompt_content, SPEC_GENERATOR_INSTRUCTION)
+    specs = await call_llm_for_json(prompt_content, load_prompt("SPEC_GENERATOR_INSTRUCTION"))
 
     if not specs or "buy_list" not in specs:
         print("   ❌ Sourcing Engineer failed to generate a valid spec sheet.")
@@ -177,6 +351,88 @@ async def generate_assembly_instructions(blueprint: dict) -> dict:
     return final_guide
 
 
+# --- DETERMINISTIC FAST PATH FOR optimize_specs ---
+# The common physics failures have a textbook fix that the Optimization
+# Engineer would only replay. Those are answered from OPTIMIZATION_RULES with
+# no LLM call; anything else (collisions, conceptual/sourcing failures, or a
+# BOM whose specs can't be read) still goes to the LLM.
+TWR_MIN = 1.5
+FLIGHT_TIME_MIN = 3.0 # minutes
+
+STATOR_RE = re.compile(r"\b(\d{4})\b")
+KV_RE = re.compile(r"(\d{3,5})\s*kv", re.IGNORECASE)
+MAH_RE = re.compile(r"(\d{3,5})\s*mah", re.IGNORECASE)
+CELLS_RE = re.compile(r"\b(\d)\s*s\b", re.IGNORECASE)
+
+def _spec_number(item: dict, key: str, pattern: re.Pattern) -> int | None:
+    """A spec from the item's specs dict, else parsed out of its product name."""
+    specs = item.get("engineering_specs") or item.get("specs") or {}
+    value = specs.get(key)
+    if isinstance(value, (int, float)): return int(value)
+    match = pattern.search(str(value or item.get("product_name") or item.get("model_name") or ""))
+    return int(match.group(1)) if match else None
+
+def _bigger_motor_query(motor: dict) -> str | None:
+    stator = _spec_number(motor, "stator_size", STATOR_RE)
+    kv = _spec_number(motor, "kv", KV_RE)
+    if stator: # e.g. 2207 -> 2407: same height, wider stator
+        return f"{stator + 200} {kv}KV FPV brushless motor" if kv else f"{stator + 200} FPV brushless motor"
+    if kv:
+        return f"{round(kv * 1.25 / 50) * 50}KV FPV brushless motor"
+    return None
+
+def _bigger_battery_query(battery: dict) -> str | None:
+    mah = _spec_number(battery, "capacity_mah", MAH_RE)
+    if not mah: return None
+    cells = _spec_number(battery, "cells", CELLS_RE)
+    new_mah = int(round(mah * 1.3, -2))
+    return f"{cells}S {new_mah}mAh LiPo battery" if cells else f"{new_mah}mAh LiPo battery"
+
+# Checked in order; the first rule that fires (and can build a query) wins,
+# matching the "single, precise replacement" contract of the LLM engineer.
+OPTIMIZATION_RULES = (
+    {
+        "metrics": ("twr",), "limit": TWR_MIN, "part_type": "Motors", "query": _bigger_motor_query,
+        "diagnosis": "Thrust-to-weight ratio {value} is below {limit}; the motors can't lift the build with margin.",
+        "strategy": "Step the motors up one stator size at the same KV (or ~25% more KV when the stator is unknown).",
+    },
+    {
+        "metrics": ("est_flight_time_min", "flight_time_min"), "limit": FLIGHT_TIME_MIN, "part_type": "Battery", "query": _bigger_battery_query,
+        "diagnosis": "Estimated flight time {value} min is below {limit} min.",
+        "strategy": "Increase battery capacity by ~30% at the same cell count.",
+    },
+)
+
+def _report_metric(report: dict, keys: tuple) -> float | None:
+    # Physics reports nest their numbers ("dynamics", "meta"); accept either layout
+    for section in (report, report.get("dynamics"), report.get("meta"), report.get("details")):
+        if isinstance(section, dict):
+            for key in keys:
+                if isinstance(section.get(key), (int, float)):
+                    return float(section[key])
+    return None
+
+def _local_optimizer(current_bom: list, failure_report: dict) -> dict | None:
+    """Rule-table fix for well-understood physics failures; None means 'ask the LLM'."""
+    failure_type = str(failure_report.get("type") or "PHYSICS").upper()
+    if failure_type != "PHYSICS":
+        return None
+    for rule in OPTIMIZATION_RULES:
+        value = _report_metric(failure_report, rule["metrics"])
+        if value is None or value >= rule["limit"]:
+            continue
+        part = next((i for i in current_bom if rule["part_type"].lower() in str(i.get("part_type", "")).lower()), None)
+        query = rule["query"](part) if part else None
+        if not query:
+            continue
+        diagnosis = rule["diagnosis"].format(value=value, limit=rule["limit"])
+        return {
+            "diagnosis": diagnosis,
+            "strategy": rule["strategy"],
+            "replacements": [{"part_type": rule["part_type"], "new_search_query": query, "reason": diagnosis}],
+        }
+    return None
+
 async def optimize_specs(current_bom: list, failure_report: dict) -> dict | None:
     """
     Analyzes a design failure and asks the AI to suggest a component replacement.
@@ -193,16 +449,22 @@ async def optimize_specs(current_bom: list, failure_report: dict) -> dict | None
     """
     print("--> 🔧 Optimization Engineer is analyzing the design failure...")
 
+    # 0. Deterministic failures are fixed from the rule table, no LLM round-trip.
+    local_fix = _local_optimizer(current_bom, failure_report)
+    if local_fix:
+        print(f"   ⚡ Rule-based fix: {local_fix['strategy']}")
+        return local_fix
+
     # 1. Prepare the context for the AI prompt.
     #    This bundles the current component list and the failure report together.
     context = {
         "current_bom": current_bom,
         "failure_report": failure_report
     }
-    prompt_content = json.dumps(context, indent=2)
+    prompt_content = to_prompt_json(context)
 
     # 2. Call the LLM with the new, more sophisticated prompt.
-    suggested_fix = await call_llm_for_json(prompt_content, OPTIMIZATION_ENGINEER_INSTRUCTION)
+    suggested_fix = await call_llm_for_json(prompt_content, load_prompt("OPTIMIZATION_ENGINEER_INSTRUCTION"))
 
     # 3. Robust fallback: If the AI fails to provide a valid fix, return None.
     #    The main loop will need to handle this as a critical, unrecoverable error.
@@ -216,6 +478,25 @@ async def optimize_specs(current_bom: list, failure_report: dict) -> dict | None
 
     return suggested_fix
 
+async def optimize_specs_batch(items: list[tuple[list, dict]], max_concurrency: int = 8) -> list[dict | None]:
+    """
+    Batch form of optimize_specs.
+
+    Args:
+        items: (current_bom, failure_report) tuples for independent designs.
+        max_concurrency: Upper bound on in-flight Gemini requests.
+
+    Returns:
+        One suggested fix (or None) per item, in input order.
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(current_bom: list, failure_report: dict) -> dict | None:
+        async with sem:
+            return await optimize_specs(current_bom, failure_report)
+
+    return await asyncio.gather(*[_one(bom, report) for bom, report in items])
+
 async def generate_assembly_blueprint(bom: list) -> dict:
     """
     Analyzes the BOM for compatibility and generates a machine-readable assembly plan.
@@ -243,11 +524,11 @@ async def generate_assembly_blueprint(bom: list) -> dict:
         })
 
     # 2. Format the BOM into a JSON string to serve as the main prompt content.
-    prompt_content = json.dumps({"bill_of_materials": context_bom}, indent=2)
+    prompt_content = to_prompt_json({"bill_of_materials": context_bom})
 
     # 3. Call the LLM using our helper function and the new, powerful prompt.
     #    The helper handles the API call, error catching, and JSON parsing.
-    blueprint = await call_llm_for_json(prompt_content, ASSEMBLY_BLUEPRINT_INSTRUCTION)
+    blueprint = await call_llm_for_json(prompt_content, load_prompt("ASSEMBLY_BLUEPRINT_INSTRUCTION"))
 
     # 4. Implement a robust fallback. If the AI fails or returns invalid data,
     #    we must return a clear "failure" blueprint to prevent the main loop from crashing.
@@ -278,10 +559,10 @@ async def ask_for_human_input(plan: dict, failed_item: dict) -> dict:
         "project_summary": plan.get("build_summary"),
         "failed_sourcing_details": failed_item
     }
-    prompt_content = json.dumps(context, indent=2)
+    prompt_content = to_prompt_json(context)
     
     # Use a different model if you want, but the main one should be fine
-    interaction_data = await call_llm_for_json(prompt_content, HUMAN_INTERACTION_PROMPT)
+    interaction_data = await call_llm_for_json(prompt_content, load_prompt("HUMAN_INTERACTION_PROMPT"))
     
     return interaction_data
 
@@ -300,7 +581,7 @@ async def generate_vision_prompt(part_type: str) -> dict | None:
 
     # Use the helper function that expects a JSON object as a response.
     # The prompt content is just the name of the part type.
-    prompt_object = await call_llm_for_json(part_type, VISION_PROMPT_ENGINEER_INSTRUCTION)
+    prompt_object = await call_llm_for_json(part_type, load_prompt("VISION_PROMPT_ENGINEER_INSTRUCTION"))
 
     if not prompt_object or "prompt_text" not in prompt_object or "json_schema" not in prompt_object:
         print(f"   ❌ Vision Prompt Engineer failed to generate a valid prompt object for {part_type}.")
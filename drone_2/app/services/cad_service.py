@@ -2,8 +2,21 @@
 import os
 import subprocess
 import logging
+import shutil
+import hashlib
+import functools
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import trimesh
 import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: fall back to running the solver as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]): return args[0]
+        return lambda fn: fn
 
 # Helper function to find parts in the BOM
 def find_part_in_bom(bom, part_type_query):
@@ -19,47 +32,200 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 SCAD_LIB_PATH = os.path.join(PROJECT_ROOT, "cad", "library.scad")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
+STL_CACHE_DIR = os.path.join(OUTPUT_DIR, "stl_cache")
+STL_EXPORT_FORMAT = "binstl" # Binary STL: smaller on disk and much faster to parse than ASCII
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+os.makedirs(STL_CACHE_DIR, exist_ok=True)
+
+@functools.lru_cache(maxsize=1)
+def openscad_version() -> str:
+    """Installed OpenSCAD version string (part of the STL cache key)."""
+    try:
+        out = subprocess.run(["openscad", "--version"], capture_output=True, text=True, timeout=10)
+        return (out.stdout + out.stderr).strip()
+    except Exception:
+        return "unknown"
+
+# OpenSCAD has no persistent/server render mode, so every render is still its
+# own process. What can stay warm is everything around it: one long-lived
+# render pool shared by all generate_assets calls, created on first use, which
+# probes the binary in the background so later renders don't pay the cold
+# load (and the version lookup for the cache key is already answered).
+RENDER_WORKERS = os.cpu_count() or 1
+_render_pool: ThreadPoolExecutor | None = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool() -> ThreadPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="openscad")
+            _render_pool.submit(openscad_version)
+        return _render_pool
+
+@functools.lru_cache(maxsize=4)
+def _library_digest(mtime_ns: int) -> str:
+    """Hash of library.scad; keyed on mtime so edits invalidate cached renders."""
+    with open(SCAD_LIB_PATH, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def scad_cache_key(script: str) -> str:
+    """Content address of a render: the script, the library it uses and the OpenSCAD build."""
+    try:
+        lib = _library_digest(os.stat(SCAD_LIB_PATH).st_mtime_ns)
+    except OSError:
+        lib = "no-library"
+    blob = f"{openscad_version()}\x1f{STL_EXPORT_FORMAT}\x1f{lib}\x1f{script}".encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+def _publish(src: str, dst: str):
+    """
+    Points a per-project path at its cached STL: a symlink where the platform
+    allows it (so the mesh exists once on disk, however many projects use it),
+    else a hard link, else a copy.
+    """
+    if os.path.lexists(dst): os.remove(dst)
+    try:
+        os.symlink(os.path.abspath(src), dst)
+    except OSError:
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
 
 def render_scad(script: str, output_filename: str) -> str | None:
     """
     Writes SCAD script to file and uses OpenSCAD to compile it to STL.
+    Renders are content-addressed: an identical script (same library, same
+    OpenSCAD) reuses the cached STL instead of launching OpenSCAD again.
     """
     scad_path = os.path.join(OUTPUT_DIR, f"{output_filename}.scad")
     stl_path = os.path.join(OUTPUT_DIR, f"{output_filename}.stl")
+    cached_path = os.path.join(STL_CACHE_DIR, f"{scad_cache_key(script)}.stl")
+    
+    if os.path.exists(cached_path):
+        _publish(cached_path, stl_path)
+        return stl_path
     
     with open(scad_path, "w") as f:
         f.write(script)
     
     try:
-        cmd = ["openscad", "-o", stl_path, scad_path]
+        # Render to a private temp name, then rename: concurrent renders of
+        # the same script never see a half-written cache entry.
+        tmp_path = f"{cached_path[:-4]}.{os.getpid()}.{threading.get_ident()}.tmp.stl"
+        cmd = ["openscad", "-o", tmp_path, "--export-format", STL_EXPORT_FORMAT, scad_path]
         subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
-        if os.path.exists(stl_path):
-            return stl_path
-        return None
+        if not os.path.exists(tmp_path):
+            return None
+        os.replace(tmp_path, cached_path)
+        _publish(cached_path, stl_path)
+        return stl_path
     except Exception as e:
         logger.error(f"❌ OpenSCAD Render Failed for {output_filename}: {e}")
-        # Return a path to a placeholder if render fails
-        placeholder_path = os.path.join(OUTPUT_DIR, f"{output_filename}_placeholder.stl")
-        with open(placeholder_path, "w") as f_ph:
-             f_ph.write("solid placeholder\nendsolid placeholder")
-        return placeholder_path
+        return _write_placeholder(output_filename)
 
+def _write_placeholder(output_filename: str) -> str:
+    # Return a path to a placeholder if render fails
+    placeholder_path = os.path.join(OUTPUT_DIR, f"{output_filename}_placeholder.stl")
+    with open(placeholder_path, "w") as f_ph:
+         f_ph.write("solid placeholder\nendsolid placeholder")
+    return placeholder_path
 
-def generate_assets(project_id: str, blueprint: dict, bom: list) -> dict:
+async def render_scad_async(script: str, output_filename: str) -> str | None:
     """
-    Generates all CAD assets, executes the assembly blueprint, and performs
-    deterministic 3D mesh collision detection.
+    Event-loop friendly render_scad: OpenSCAD runs as an asyncio subprocess
+    with the script piped over stdin (no .scad file), so an async caller keeps
+    serving other work while it compiles. Shares render_scad's STL cache.
     """
-    print("--> 🏗️  CAD Service: Executing blueprint and validating geometry...")
-    assets = {
+    stl_path = os.path.join(OUTPUT_DIR, f"{output_filename}.stl")
+    cached_path = os.path.join(STL_CACHE_DIR, f"{scad_cache_key(script)}.stl")
+    
+    if os.path.exists(cached_path):
+        _publish(cached_path, stl_path)
+        return stl_path
+    
+    tmp_path = f"{cached_path[:-4]}.{os.getpid()}.{id(asyncio.current_task())}.tmp.stl"
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "openscad", "-o", tmp_path, "--export-format", STL_EXPORT_FORMAT, "-",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            await asyncio.wait_for(proc.communicate(script.encode("utf-8")), timeout=30)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, "openscad")
+        if not os.path.exists(tmp_path):
+            return None
+        os.replace(tmp_path, cached_path)
+        _publish(cached_path, stl_path)
+        return stl_path
+    except Exception as e:
+        logger.error(f"❌ OpenSCAD Render Failed for {output_filename}: {e!r}")
+        return _write_placeholder(output_filename)
+
+
+def _load_mesh(stl_path: str | None, part_type: str):
+    if not stl_path or not os.path.exists(stl_path):
+        return None
+    try:
+        # Use a processing flag to handle potential mesh issues
+        mesh = trimesh.load_mesh(stl_path, process=True)
+        return None if mesh.is_empty else mesh
+    except Exception as e:
+        print(f"      - Warning: Could not load mesh for {part_type}: {e}")
+        return None
+
+def render_and_load(script: str, output_filename: str, part_type: str):
+    """
+    Renders one part and loads its mesh for collision checking.
+    Returns (stl_path, mesh), where mesh is None if it could not be used.
+    """
+    stl_path = render_scad(script, output_filename)
+    return stl_path, _load_mesh(stl_path, part_type)
+
+async def render_and_load_async(script: str, output_filename: str, part_type: str):
+    """Async render_and_load; the (CPU-bound) mesh parse runs in a worker thread."""
+    stl_path = await render_scad_async(script, output_filename)
+    return stl_path, await asyncio.to_thread(_load_mesh, stl_path, part_type)
+
+
+@njit(cache=True)
+def solve_geometry(wheelbase_mm: float, prop_diam_mm: float, motor_z: float):
+    """
+    Pure-numeric layout solver (JIT-compiled when numba is available, so
+    optimization sweeps can call it in a tight loop).
+
+    Returns:
+        (motor_positions [4x3], prop diameter in inches)
+    """
+    offset = (wheelbase_mm / 2) * 0.7071
+    motor_positions = np.empty((4, 3))
+    signs = ((1.0, 1.0), (-1.0, 1.0), (-1.0, -1.0), (1.0, -1.0))
+    for i in range(4):
+        motor_positions[i, 0] = signs[i][0] * offset
+        motor_positions[i, 1] = signs[i][1] * offset
+        motor_positions[i, 2] = motor_z
+    return motor_positions, prop_diam_mm / 25.4
+
+def warm_kernels():
+    """Compiles (or loads from the numba cache) solve_geometry ahead of the first build."""
+    solve_geometry(225.0, 127.0, 5.0)
+
+def _new_assets() -> dict:
+    return {
         "individual_parts": {},
         "assembly_files": {},
         "calculated_specs": {},
         "collision_report": {"collided": False, "colliding_parts": []}
     }
-    
-    # --- 1. EXTRACT SPECS & GENERATE INDIVIDUAL MODELS ---
+
+def _plan_parts(bom: list, assets: dict):
+    """Extracts the part specs from the BOM; returns (part_definitions, motor_positions)."""
     frame_part = find_part_in_bom(bom, "frame") or {}
     motor_part = find_part_in_bom(bom, "motor") or {}
     prop_part = find_part_in_bom(bom, "propeller") or {}
@@ -81,43 +247,87 @@ def generate_assets(project_id: str, blueprint: dict, bom: list) -> dict:
     battery_capacity = int(get_spec(bat_part, "capacity_mah", 1300))
     is_digital = "true" if cam_width_mm > 19 else "false"
     
+    motor_positions, prop_diam_in = solve_geometry(wheelbase, prop_diam_mm, 5.0)
+    motor_positions = motor_positions.tolist()
+    
     assets["calculated_specs"] = {
         "wheelbase": wheelbase, "prop_diameter_mm": prop_diam_mm, "fc_mounting_mm": fc_mount_mm,
     }
     
-    print("    -> Generating individual component models...")
     part_definitions = {
         "Frame_Kit": f'use <{SCAD_LIB_PATH}>; pro_frame({wheelbase});',
         "Motors": f'use <{SCAD_LIB_PATH}>; pro_motor({motor_stator_size});',
-        "Propellers": f'use <{SCAD_LIB_PATH}>; pro_prop({prop_diam_mm / 25.4});',
+        "Propellers": f'use <{SCAD_LIB_PATH}>; pro_prop({prop_diam_in});',
         "FC_Stack": f'use <{SCAD_LIB_PATH}>; pro_stack({fc_mount_mm}, {is_digital});',
         "Camera_VTX_Kit": f'use <{SCAD_LIB_PATH}>; pro_camera({cam_width_mm});',
         "Battery": f'use <{SCAD_LIB_PATH}>; pro_battery({battery_cells}, {battery_capacity});',
         "Companion_Computer": f'use <{SCAD_LIB_PATH}>; pro_companion_computer();' # Assumes a generic model
     }
+    return part_definitions, motor_positions
 
-    for part_name, script in part_definitions.items():
-        assets["individual_parts"][part_name] = render_scad(script, f"{project_id}_{part_name.lower()}")
+def generate_assets(project_id: str, blueprint: dict, bom: list) -> dict:
+    """
+    Generates all CAD assets, executes the assembly blueprint, and performs
+    deterministic 3D mesh collision detection.
+    """
+    print("--> 🏗️  CAD Service: Executing blueprint and validating geometry...")
+    assets = _new_assets()
+    
+    # --- 1. EXTRACT SPECS & GENERATE INDIVIDUAL MODELS ---
+    part_definitions, motor_positions = _plan_parts(bom, assets)
+    
+    print("    -> Generating individual component models...")
 
+    # Each render is an independent OpenSCAD process, so run them side by side.
+    # Threads are enough here: the work happens in the child processes, not under the GIL.
+    # Each worker also loads its mesh as soon as its own render lands, so
+    # parsing fast parts overlaps with the slow renders still in flight.
+    assembled_meshes = {}
+    pool = get_render_pool()
+    renders = {
+        part_name: pool.submit(render_and_load, script, f"{project_id}_{part_name.lower()}", part_name)
+        for part_name, script in part_definitions.items()
+    }
+    for part_name, future in renders.items():
+        stl_path, mesh = future.result()
+        assets["individual_parts"][part_name] = stl_path
+        if mesh is not None:
+            assembled_meshes[part_name] = mesh
+
+    return _validate_and_assemble(project_id, blueprint, assets, assembled_meshes, motor_positions)
+
+async def generate_assets_async(project_id: str, blueprint: dict, bom: list) -> dict:
+    """
+    generate_assets for async callers: the renders run as asyncio subprocesses
+    (gathered, RENDER_WORKERS at a time) instead of blocking a thread each.
+    """
+    print("--> 🏗️  CAD Service: Executing blueprint and validating geometry...")
+    assets = _new_assets()
+    part_definitions, motor_positions = _plan_parts(bom, assets)
+    
+    print("    -> Generating individual component models...")
+    sem = asyncio.Semaphore(RENDER_WORKERS)
+
+    async def _render(part_name: str, script: str):
+        async with sem:
+            return await render_and_load_async(script, f"{project_id}_{part_name.lower()}", part_name)
+
+    results = await asyncio.gather(*[_render(name, script) for name, script in part_definitions.items()])
+    assembled_meshes = {}
+    for part_name, (stl_path, mesh) in zip(part_definitions, results):
+        assets["individual_parts"][part_name] = stl_path
+        if mesh is not None:
+            assembled_meshes[part_name] = mesh
+
+    # Collision checking is CPU-bound trimesh work; keep it off the event loop
+    return await asyncio.to_thread(_validate_and_assemble, project_id, blueprint, assets, assembled_meshes, motor_positions)
+
+def _validate_and_assemble(project_id: str, blueprint: dict, assets: dict, assembled_meshes: dict, motor_positions: list) -> dict:
     # =====================================================================
     # 2. DETERMINISTIC COLLISION DETECTION
     # =====================================================================
     print("    -> Performing deterministic 3D collision check...")
     collision_manager = trimesh.collision.CollisionManager()
-    assembled_meshes = {}
-
-    for part_type, stl_path in assets["individual_parts"].items():
-        if stl_path and os.path.exists(stl_path):
-            try:
-                # Use a processing flag to handle potential mesh issues
-                mesh = trimesh.load_mesh(stl_path, process=True)
-                if not mesh.is_empty:
-                    assembled_meshes[part_type] = mesh
-            except Exception as e:
-                print(f"      - Warning: Could not load mesh for {part_type}: {e}")
-
-    offset = (wheelbase / 2) * 0.7071
-    motor_positions = [[offset, offset, 5], [-offset, offset, 5], [-offset, -offset, 5], [offset, -offset, 5]]
 
     if "Frame_Kit" in assembled_meshes:
         collision_manager.add_object("Frame_Kit_0", assembled_meshes["Frame_Kit"])
@@ -158,36 +368,41 @@ def generate_assets(project_id: str, blueprint: dict, bom: list) -> dict:
     # =====================================================================
     assembly_script_lines = [f'// Assembly for Project: {project_id}\n$fn=50;\n']
     
-    # Use import() for STLs which is more reliable than include for complex geometry
+    # Use import() for STLs which is more reliable than include for complex geometry.
+    # Each STL is imported in exactly one module; every placement instantiates
+    # that module, so OpenSCAD parses each mesh once instead of once per copy.
+    part_modules = {}
     for part_name, stl_path in assets["individual_parts"].items():
         if stl_path:
-             # Create a wrapper .scad file for each STL to be included
-             scad_wrapper_path = os.path.join(OUTPUT_DIR, f"{project_id}_{part_name.lower()}_wrapper.scad")
-             with open(scad_wrapper_path, "w") as f:
-                 # Use an absolute path for reliability
-                 abs_stl_path = os.path.abspath(stl_path).replace('\\', '/')
-                 f.write(f'import("{abs_stl_path}");')
+            module_name = f"part_{part_name.lower()}"
+            # Absolute path into the STL cache (resolves the per-project symlink)
+            abs_stl_path = os.path.realpath(stl_path).replace('\\', '/')
+            assembly_script_lines.append(f'module {module_name}() {{ import("{abs_stl_path}"); }}')
+            part_modules[part_name.lower()] = module_name
+    assembly_script_lines.append("")
     
-    assembly_script_lines.append(f'include <{os.path.join(OUTPUT_DIR, f"{project_id}_frame_kit_wrapper.scad")}>;')
+    if "frame_kit" in part_modules:
+        assembly_script_lines.append(f'{part_modules["frame_kit"]}();')
 
     for step in blueprint.get("blueprint_steps", []):
         action = step.get("action")
         part_type = step.get("target_part_type").lower()
         
-        wrapper_path = os.path.join(OUTPUT_DIR, f"{project_id}_{part_type}_wrapper.scad")
+        module_name = part_modules.get(part_type)
+        if not module_name: continue
         
         if action == "MOUNT_MOTORS":
-            for pos in motor_positions: assembly_script_lines.append(f'translate([{pos[0]}, {pos[1]}, {pos[2]}]) include <{wrapper_path}>;')
+            for pos in motor_positions: assembly_script_lines.append(f'translate([{pos[0]}, {pos[1]}, {pos[2]}]) {module_name}();')
         elif action == "INSTALL_STACK":
-            assembly_script_lines.append(f'translate([0, 0, 8]) include <{wrapper_path}>;')
+            assembly_script_lines.append(f'translate([0, 0, 8]) {module_name}();')
         elif action == "SECURE_CAMERA":
-            assembly_script_lines.append(f'translate([0, 35, 10]) include <{wrapper_path}>;')
+            assembly_script_lines.append(f'translate([0, 35, 10]) {module_name}();')
         elif action == "ATTACH_PROPS":
-            for pos in motor_positions: assembly_script_lines.append(f'translate([{pos[0]}, {pos[1]}, {pos[2]+10}]) include <{wrapper_path}>;')
+            for pos in motor_positions: assembly_script_lines.append(f'translate([{pos[0]}, {pos[1]}, {pos[2]+10}]) {module_name}();')
         elif action == "MOUNT_BATTERY":
-            assembly_script_lines.append(f'translate([0, 0, -20]) include <{wrapper_path}>;')
+            assembly_script_lines.append(f'translate([0, 0, -20]) {module_name}();')
         elif action == "MOUNT_COMPUTER":
-            assembly_script_lines.append(f'translate([0, 0, 20]) include <{wrapper_path}>;')
+            assembly_script_lines.append(f'translate([0, 0, 20]) {module_name}();')
 
     full_assembly_script = "\n".join(assembly_script_lines)
     assets["assembly_files"]["scad"] = os.path.join(OUTPUT_DIR, f"{project_id}_assembly.scad")
@@ -1,13 +1,26 @@
 # FILE: app/services/cost_service.py
 import re
-from urllib.parse import urlparse
+from collections import defaultdict
+from functools import lru_cache
+
+# Matches the first "12.34" / "12,34" style amount in a free-text price like "$24.99"
+PRICE_RE = re.compile(r'(\d+[\.,]\d{2})')
+
+@lru_cache(maxsize=1024) # vendors repeat across BOM items
+def vendor_domain(url) -> str:
+    """'https://www.getfpv.com/...' -> 'getfpv.com'; 'Unknown' when there is no usable URL."""
+    if not url: return "Unknown"
+    # Only the host is needed, so split it out directly instead of a full urlparse
+    _, _, rest = url.partition("://")
+    host = rest.partition("/")[0].partition("?")[0].partition(":")[0]
+    return host.removeprefix("www.") or "Unknown"
 
 def generate_procurement_manifest(bom: list) -> dict:
     """
     Calculates total cost and groups items by vendor with robust price handling.
     """
     subtotal = 0.0
-    vendor_list = {}
+    vendor_list = defaultdict(list)
     
     for item in bom:
         price_data = item.get("price") # Can be float, int, string, or None
@@ -21,7 +34,7 @@ def generate_procurement_manifest(bom: list) -> dict:
             price_val = float(price_data)
         elif isinstance(price_data, str):
             # Fallback for strings like "$24.99" or "Check Site"
-            match = re.search(r'(\d+[\.,]\d{2})', price_data)
+            match = PRICE_RE.search(price_data)
             if match:
                 try:
                     clean_price = match.group(1).replace(",", "")
@@ -37,18 +50,11 @@ def generate_procurement_manifest(bom: list) -> dict:
         item_total_price = price_val * quantity
 
         # 2. Extract Vendor
-        domain = "Unknown"
-        if url:
-            try:
-                domain = urlparse(url).netloc.replace("www.", "")
-            except: pass
+        domain = vendor_domain(url)
             
         # 3. Aggregate
         subtotal += item_total_price
         
-        if domain not in vendor_list:
-            vendor_list[domain] = []
-            
         vendor_list[domain].append({
             "part": item.get("part_type"),
             "name": item.get("product_name"),
@@ -68,5 +74,5 @@ def generate_procurement_manifest(bom: list) -> dict:
         "estimated_shipping": round(shipping_est, 2),
         "estimated_tax": round(tax_est, 2),
         "total_estimated_cost": round(total_est, 2),
-        "vendors": vendor_list
+        "vendors": dict(vendor_list)
     }
\ No newline at end of file
@@ -3,7 +3,7 @@ import asyncio
 import re
 from bs4 import BeautifulSoup
 from app.services.search_service import find_components
-from app.services.recon_service import Scraper
+from app.services.recon_service import get_scraper
 
 # A whitelist of trusted sources for motor thrust data.
 # This is a critical heuristic to improve data quality.
@@ -87,7 +87,7 @@ async def find_thrust_data(motor_name: str, prop_size_inch: float) -> dict | Non
     clean_motor_name = re.sub(r'(\d{4}).*', r'\1', motor_name).strip()
     
     query = f'"{clean_motor_name}" {prop_size_inch} inch propeller thrust test data'
-    search_results = find_components(query, limit=5)
+    search_results = await find_components(query, limit=5)
 
     # Prioritize results from our trusted domain list
     prioritized_urls = [
@@ -100,31 +100,31 @@ async def find_thrust_data(motor_name: str, prop_size_inch: float) -> dict | Non
     
     urls_to_check = prioritized_urls + other_urls
 
-    async with Scraper() as scraper:
-        for url in urls_to_check:
-            try:
-                scraped_data = await scraper.scrape_product_page(url)
-                if not scraped_data or not scraped_data.get('text'):
-                    continue
-                
-                # We need the raw HTML for table parsing, which recon_service doesn't provide.
-                # A better long-term solution would be to make scrape_product_page return HTML.
-                # For now, we can infer it from the text (less reliable). A direct scrape would be better.
-                # Let's assume for this implementation we have a way to get the full HTML.
-                # A more realistic implementation would require modifying the scraper.
-                # Let's mock this by re-scraping for the full content.
-                page = await scraper.browser.new_page()
-                await page.goto(url, timeout=20000)
-                html_content = await page.content()
-                await page.close()
-
-                thrust_table = await _parse_thrust_table(html_content)
-                if thrust_table:
-                    print(f"   ✅ Found and parsed credible thrust data from: {url}")
-                    return thrust_table
-            except Exception as e:
-                print(f"   -> Could not process URL {url}: {e}")
+    scraper = await get_scraper()
+    for url in urls_to_check:
+        try:
+            scraped_data = await scraper.scrape_product_page(url)
+            if not scraped_data or not scraped_data.get('text'):
                 continue
-                
+            
+            # We need the raw HTML for table parsing, which recon_service doesn't provide.
+            # A better long-term solution would be to make scrape_product_page return HTML.
+            # For now, we can infer it from the text (less reliable). A direct scrape would be better.
+            # Let's assume for this implementation we have a way to get the full HTML.
+            # A more realistic implementation would require modifying the scraper.
+            # Let's mock this by re-scraping for the full content.
+            page = await scraper.new_page()
+            await page.goto(url, timeout=20000)
+            html_content = await page.content()
+            await page.close()
+
+            thrust_table = await _parse_thrust_table(html_content)
+            if thrust_table:
+                print(f"   ✅ Found and parsed credible thrust data from: {url}")
+                return thrust_table
+        except Exception as e:
+            print(f"   -> Could not process URL {url}: {e}")
+            continue
+            
     print("   ❌ No credible thrust data found after checking all sources.")
     return None
\ No newline at end of file
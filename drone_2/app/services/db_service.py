@@ -1,5 +1,3 @@
-import copy
-
 class EngineeringOptimizer:
     """
     The 'Brain' of the operation.
@@ -11,7 +9,9 @@ class EngineeringOptimizer:
         Input: Current CAD Specs + Physics Report
         Output: New Specs + Reasoning
         """
-        new_specs = copy.deepcopy(current_specs)
+        # Shallow copy: only top-level scalars (prop_diameter_inch, name,
+        # motor_mount_mm) are ever replaced, never nested containers
+        new_specs = dict(current_specs)
         fixes = []
         status = flight_report['status']
         log = flight_report.get('flight_log', {})
@@ -73,6 +73,6 @@ class EngineeringOptimizer:
             try:
                 new_v = int(v) + 1
                 return f"{base}_V{new_v}"
-            except:
+            except ValueError:
                 pass
         return f"{name}_V2"
\ No newline at end of file
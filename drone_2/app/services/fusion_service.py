@@ -1,7 +1,11 @@
 # FILE: app/services/fusion_service.py
 import asyncio
-from app.services.recon_service import Scraper
-from app.services.vision_service import analyze_image_for_specs
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from app.services.recon_service import get_scraper
+from app.services.vision_service import analyze_images_batch, VISION_BATCH_MAX
 from app.services.library_service import infer_motor_mounting, extract_prop_diameter
 from app.services.search_service import find_components
 from app.services.ai_service import generate_vision_prompt 
@@ -14,9 +18,21 @@ GENERIC_TITLE_BLOCKLIST = ["collections", "products", "category", "browse", "sho
 # We remove the hardcoded threshold and pass it as an argument instead
 DEFAULT_VISION_CONFIDENCE = 0.6 
 
-async def process_single_candidate(scraper, item, part_type, vision_prompt_object, min_confidence):
+# --- FUSION CACHE ---
+# A (part_type, search_query) that was already fused returns the same part for
+# an hour instead of re-running search, scraping and vision. Optimizer loops
+# re-source the unchanged parts of a BOM over and over.
+FUSION_CACHE_SIZE = 256
+FUSION_CACHE_TTL_S = 3600
+_fusion_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+def _fusion_cache_key(part_type: str, search_query: str, search_limit: int, min_confidence: float) -> str:
+    return hashlib.blake2b(f"{part_type}|{search_query}|{search_limit}|{min_confidence}".encode("utf-8")).hexdigest()
+
+async def scrape_candidate(scraper, item):
     """
-    Processes a single search result with DYNAMIC confidence requirements.
+    Scrapes a single search result; None if it is filtered out or has no real price.
+    Vision runs afterwards, batched across every candidate (see apply_vision_specs).
     """
     link = item.get('link')
     title = item.get('title')
@@ -35,63 +51,93 @@ async def process_single_candidate(scraper, item, part_type, vision_prompt_objec
     if not final_price or not isinstance(final_price, (int, float)) or final_price <= 0.50:
         return None
 
+    return {
+        "product_name": title, "price": final_price, "source_url": link,
+        "image_url": scraped_data.get('image_url'), "engineering_data": {}
+    }
+
+def apply_vision_specs(candidate, part_type, raw_vision_result, min_confidence):
+    """
+    Fills candidate["engineering_data"] with DYNAMIC confidence requirements.
+    """
     validated_specs = {} 
-    image_url = scraped_data.get('image_url')
     
     # --- VISION CHECK ---
-    if image_url and vision_prompt_object:
-        raw_vision_result = await analyze_image_for_specs(image_url, part_type, vision_prompt_object)
-        
-        if raw_vision_result and not raw_vision_result.get("error"):
-            for key, data in raw_vision_result.items():
-                if isinstance(data, dict):
-                    confidence = data.get("confidence", 0)
-                    value = data.get("value")
-                    
-                    # USE THE PASSED MIN_CONFIDENCE
-                    if value is not None and confidence >= min_confidence:
-                        validated_specs[key] = value
-                    else:
-                        print(f"      -> {key}: Rejected (Conf {confidence:.2f} < {min_confidence})")
-
-            if validated_specs:
-                 validated_specs["source"] = "vision"
+    if raw_vision_result and not raw_vision_result.get("error"):
+        for key, data in raw_vision_result.items():
+            if isinstance(data, dict):
+                confidence = data.get("confidence", 0)
+                value = data.get("value")
+                
+                # USE THE PASSED MIN_CONFIDENCE
+                if value is not None and confidence >= min_confidence:
+                    validated_specs[key] = value
+                else:
+                    print(f"      -> {key}: Rejected (Conf {confidence:.2f} < {min_confidence})")
+
+        if validated_specs:
+             validated_specs["source"] = "vision"
 
     # Fallback to text inference if Vision failed
     engineering_specs = validated_specs.copy()
     if part_type == "Motors" and "mounting_mm" not in engineering_specs:
-        inferred = infer_motor_mounting(title)
+        inferred = infer_motor_mounting(candidate["product_name"])
         if inferred:
             engineering_specs["mounting_mm"] = inferred
             engineering_specs["source"] = "text_inference"
 
-    return {
-        "product_name": title, "price": final_price, "source_url": link,
-        "image_url": image_url, "engineering_data": engineering_specs
-    }
+    candidate["engineering_data"] = engineering_specs
+    return candidate
 
 async def fuse_component_data(part_type: str, search_query: str, search_limit: int = 5, min_confidence: float = 0.6):
     """
     Orchestrates finding and analyzing a component.
     Now accepts strictness parameters.
+    Successful results are cached (see FUSION_CACHE_TTL_S).
     """
+    key = _fusion_cache_key(part_type, search_query, search_limit, min_confidence)
+    cached = _fusion_cache.get(key)
+    if cached and time.monotonic() - cached[0] < FUSION_CACHE_TTL_S:
+        _fusion_cache.move_to_end(key)
+        print(f"\n♻️  FUSION CACHE ({part_type}): '{search_query}'")
+        # Callers edit the part they get back, so never hand out the cached object
+        return copy.deepcopy(cached[1])
+
+    result = await _fuse_component_data(part_type, search_query, search_limit, min_confidence)
+    if result is not None:
+        _fusion_cache[key] = (time.monotonic(), copy.deepcopy(result))
+        _fusion_cache.move_to_end(key)
+        if len(_fusion_cache) > FUSION_CACHE_SIZE:
+            _fusion_cache.popitem(last=False)
+    return result
+
+async def _fuse_component_data(part_type: str, search_query: str, search_limit: int, min_confidence: float):
     print(f"\n🔎 FUSION SEARCH ({part_type}): '{search_query}' (Strictness: {min_confidence*100}%)")
     
-    vision_prompt_object = await generate_vision_prompt(part_type)
+    # The vision prompt (LLM) and the search (CSE) are independent, so overlap them.
+    # Use the custom limit (e.g., 10 results instead of 5)
+    vision_prompt_object, results = await asyncio.gather(
+        generate_vision_prompt(part_type),
+        find_components(search_query, limit=search_limit),
+    )
     if not vision_prompt_object:
         print(f"   ⚠️  Vision Prompt Generation Failed.")
         return None
-
-    # Use the custom limit (e.g., 10 results instead of 5)
-    results = find_components(search_query, limit=search_limit)
     if not results: return None
 
-    async with Scraper() as scraper:
-        # Pass the strict min_confidence down
-        tasks = [process_single_candidate(scraper, res, part_type, vision_prompt_object, min_confidence) for res in results]
-        candidates = await asyncio.gather(*tasks)
-        
-    valid_candidates = [c for c in candidates if c is not None]
+    scraper = await get_scraper()
+    scraped = await asyncio.gather(*(scrape_candidate(scraper, res) for res in results))
+    valid_candidates = [c for c in scraped if c is not None]
+
+    # One Vision request covers every candidate image instead of one per candidate
+    vision_results = [None] * len(valid_candidates)
+    imaged = [i for i, c in enumerate(valid_candidates) if c["image_url"]][:VISION_BATCH_MAX]
+    if imaged:
+        batch = await analyze_images_batch([(valid_candidates[i]["image_url"], part_type) for i in imaged], vision_prompt_object)
+        for i, result in zip(imaged, batch): vision_results[i] = result
+    for candidate, raw_vision_result in zip(valid_candidates, vision_results):
+        apply_vision_specs(candidate, part_type, raw_vision_result, min_confidence)
+
     if not valid_candidates: return None
 
     # Rank them
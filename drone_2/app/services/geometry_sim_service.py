@@ -1,5 +1,39 @@
 # FILE: app/services/geometry_sim_service.py
-import math
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: fall back to running the kernel as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]): return args[0]
+        return lambda fn: fn
+
+# Wheelbase (diagonal) -> side of the motor square, as a multiply
+INV_SQRT2 = 0.7071067811865476
+PROP_GAP_FAIL_MM = 2.0   # A small buffer for safety and air turbulence
+PROP_GAP_WARN_MM = 10.0
+
+@njit(cache=True)
+def geometry_kernel(wheelbase: float, prop_diam_mm: float):
+    """
+    Numeric core of the simulation (JIT-compiled when numba is available;
+    the optimizer loop calls it once per candidate design).
+
+    Returns:
+        (prop_tip_gap_mm, severity) with severity 0 = ok, 1 = tight, 2 = collision
+    """
+    # In a standard 'X' frame, the distance between adjacent motor shafts
+    # is the side length of the square, calculated from the diagonal wheelbase.
+    # The gap is that distance minus the diameter of one propeller.
+    prop_tip_gap = wheelbase * INV_SQRT2 - prop_diam_mm
+    if prop_tip_gap < PROP_GAP_FAIL_MM:
+        return prop_tip_gap, 2
+    if prop_tip_gap < PROP_GAP_WARN_MM:
+        return prop_tip_gap, 1
+    return prop_tip_gap, 0
+
+def warm_kernels():
+    """Compiles (or loads from the numba cache) geometry_kernel ahead of the first design."""
+    geometry_kernel(250.0, 127.0)
 
 def run_geometric_simulation(specs: dict) -> dict:
     """
@@ -34,17 +68,12 @@ def run_geometric_simulation(specs: dict) -> dict:
         return report
 
     # --- CHECK 1: Propeller Collision ---
-    # In a standard 'X' frame, the distance between adjacent motor shafts
-    # is the side length of the square, calculated from the diagonal wheelbase.
-    side_dist_between_motors = wheelbase / math.sqrt(2)
-
-    # The gap is the distance between motors minus the diameter of one propeller.
-    prop_tip_gap = side_dist_between_motors - prop_diam_mm
+    prop_tip_gap, severity = geometry_kernel(wheelbase, prop_diam_mm)
 
-    if prop_tip_gap < 2.0:  # A small buffer for safety and air turbulence
+    if severity == 2:
         report['status'] = 'FAIL'
         report['errors'].append(f"CRITICAL: Propellers collide or have insufficient clearance. Gap is {prop_tip_gap:.2f}mm.")
-    elif prop_tip_gap < 10.0:
+    elif severity == 1:
         report['warnings'].append(f"Propeller tip clearance is very tight ({prop_tip_gap:.2f}mm). High potential for turbulence.")
 
     report['metrics']['prop_tip_gap_mm'] = round(prop_tip_gap, 2)
@@ -33,6 +33,18 @@ STANDARD_MOTOR_PATTERNS = {
     "2810": 19.0
 }
 
+# Compiled once; IGNORECASE replaces lower()-ing every title first
+# Alternation over the known stator codes only: a KV rating, price or year in
+# the title can't shadow the real stator, and a hit is always a table key
+STATOR_RE = re.compile(r"\b(" + "|".join(map(re.escape, STANDARD_MOTOR_PATTERNS)) + r")\b")
+# All three prop notations in one pass; m.lastgroup says which one matched
+PROP_SIZE_RE = re.compile(
+    r"\b(?P<mm>\d{2})\s*mm"                     # 31mm, 40 mm
+    r"|\b(?P<inch>\d(?:\.\d)?)\s*(?:inch|\"|in)\b"  # 5", 5 inch, 5.1in
+    r"|\b(?P<code>[3-7])\d{3}\b",                # 5143, 3040
+    re.IGNORECASE,
+)
+
 def infer_motor_mounting(product_title: str) -> Optional[float]:
     """
     If Vision fails, guess mounting based on motor stator size in title.
@@ -41,14 +53,9 @@ def infer_motor_mounting(product_title: str) -> Optional[float]:
     if not product_title:
         return None
 
-    # Extract 4-digit stator size (e.g., 0802, 2207)
-    # \b ensures we don't match inside other numbers
-    match = re.search(r"\b(\d{4})\b", product_title)
-    if match:
-        size = match.group(1)
-        return STANDARD_MOTOR_PATTERNS.get(size, None)
-    
-    return None
+    # Known 4-digit stator size (e.g., 0802, 2207)
+    match = STATOR_RE.search(product_title)
+    return STANDARD_MOTOR_PATTERNS[match.group(1)] if match else None
 
 def extract_prop_diameter(product_title: str) -> Optional[float]:
     """
@@ -57,28 +64,27 @@ def extract_prop_diameter(product_title: str) -> Optional[float]:
     """
     if not product_title:
         return None
-        
-    lower_title = product_title.lower()
 
-    # 1. Try millimeter match first (Common for Whoops: 31mm, 40mm, 65mm, 75mm)
-    # We look for 2 digits followed specifically by 'mm'
-    mm_match = re.search(r"\b(\d{2})\s*mm", lower_title)
-    if mm_match:
-        return float(mm_match.group(1))
-    
-    # 2. Try inch match (Common for Freestyle: 5", 5 inch, 5.1 inch)
-    # Matches: "5 inch", "5inch", "5.1 inch", "7 inch"
-    inch_match = re.search(r"\b(\d(?:\.\d)?)\s*(?:inch|\"|in)\b", lower_title)
-    if inch_match:
-        return float(inch_match.group(1)) * 25.4
-    
-    # 3. Try "Prop Size Notation" (e.g., 5143 = 5.1 inch, 3040 = 3.0 inch)
-    # Look for 4 digits where the first digit is 3-7 (likely a prop size code, not a year or kv)
-    code_match = re.search(r"\b([3-7])\d{3}\b", lower_title)
-    if code_match:
-        # e.g. 5143 -> 5.1 inch
-        # This is aggressive, might false positive on dates, but useful for props
-        first_digit = float(code_match.group(1))
-        return first_digit * 25.4
+    # One scan; the notations keep their priority: mm, then inch, then code
+    inch = code = None
+    for match in PROP_SIZE_RE.finditer(product_title):
+        kind = match.lastgroup
+        # 1. Millimeters (Common for Whoops: 31mm, 40mm, 65mm, 75mm)
+        if kind == "mm":
+            return float(match["mm"])
+        if kind == "inch":
+            if inch is None: inch = match["inch"]
+        elif code is None:
+            code = match["code"]
+
+    # 2. Inches (Common for Freestyle: 5", 5 inch, 5.1 inch)
+    if inch is not None:
+        return float(inch) * 25.4
+
+    # 3. "Prop Size Notation" (e.g., 5143 = 5.1 inch, 3040 = 3.0 inch)
+    # First digit 3-7 (likely a prop size code, not a year or kv). This is
+    # aggressive, might false positive on dates, but useful for props
+    if code is not None:
+        return float(code) * 25.4
 
     return None
\ No newline at end of file
@@ -2,6 +2,13 @@
 import re
 import math
 import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: fall back to running the kernel as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]): return args[0]
+        return lambda fn: fn
 
 # --- CONFIGURATION ---
 GRAVITY = 9.81
@@ -16,15 +23,39 @@ FALLBACK_WEIGHTS = {
     "propellers": 5.0,
 }
 
+NUMBER_RE = re.compile(r"(\d+(\.\d+)?)")
+STATOR_RE = re.compile(r"(\d{4})")
+
+@njit(cache=True)
+def flight_kernel(mass_g: float, thrust_per_motor_g: float, capacity_mah: float):
+    """
+    Numeric core of generate_physics_config (JIT-compiled when numba is
+    available; catalog fabrication runs it for every BOM).
+
+    Returns:
+        (max force per motor in N, TWR, est. hover flight time in minutes)
+    """
+    max_force_newtons = (thrust_per_motor_g / 1000.0) * GRAVITY
+    twr = thrust_per_motor_g * 4 / mass_g if mass_g > 0 else 0.0
+    # Heuristic: Hover amps approx (Weight / 40)
+    # 500g drone -> ~12.5 Amps hover
+    hover_amps = mass_g / 40.0
+    if hover_amps <= 0:
+        return max_force_newtons, twr, 0.0
+    hours = (capacity_mah / 1000.0) / hover_amps
+    return max_force_newtons, twr, hours * 60 * 0.8 # 80% efficiency factor
+
+def warm_kernels():
+    """Compiles (or loads from the numba cache) flight_kernel ahead of the first BOM."""
+    flight_kernel(500.0, 1000.0, 1300.0)
+
 def _extract_number(text, default=0.0):
     """Robust extraction of numbers from dirty strings (e.g., 'approx 35g')."""
     if isinstance(text, (int, float)): return float(text)
     if not text: return default
-    try:
-        match = re.search(r"(\d+(\.\d+)?)", str(text))
-        return float(match.group(1)) if match else default
-    except:
-        return default
+    # Whatever the regex matched is always a valid float literal, so no try/except
+    match = NUMBER_RE.search(str(text))
+    return float(match.group(1)) if match else default
 
 def _calculate_auw(bom):
     """Calculates All-Up-Weight in Grams."""
@@ -61,7 +92,7 @@ def _estimate_max_thrust(motor_item, prop_item):
     kv = _extract_number(specs.get('kv', 1700))
     # Try to parse stator size from model name (e.g., "2207")
     model = motor_item.get('model_name', '')
-    stator_match = re.search(r"(\d{4})", model)
+    stator_match = STATOR_RE.search(model)
     stator_vol = 0
     if stator_match:
         d = int(stator_match.group(1)[:2])
@@ -101,10 +132,8 @@ def generate_physics_config(bom):
     
     # 3. Calculate Force Properties
     max_thrust_g_per_motor = _estimate_max_thrust(motors, props)
-    max_force_newtons = (max_thrust_g_per_motor / 1000.0) * GRAVITY
-    
-    total_thrust_g = max_thrust_g_per_motor * 4
-    twr = total_thrust_g / mass_g if mass_g > 0 else 0
+    mah = _extract_number(battery.get('specs', {}).get('capacity_mah'), 1300)
+    max_force_newtons, twr, flight_time_min = flight_kernel(mass_g, max_thrust_g_per_motor, mah)
     
     # 4. Calculate Dimensions (for Colliders)
     wb_mm = _extract_number(frame.get('specs', {}).get('wheelbase_mm'), 225)
@@ -135,20 +164,9 @@ def generate_physics_config(bom):
         },
         "meta": {
             "total_weight_g": round(mass_g, 1),
-            "est_flight_time_min": _calculate_flight_time(battery, mass_g)
+            "est_flight_time_min": round(flight_time_min, 1)
         }
     }
     
     print(f"   📊 Physics Ready: Mass={mass_kg}kg, MaxForce={max_force_newtons}N, TWR={twr:.1f}")
     return config
-
-def _calculate_flight_time(battery_item, total_weight_g):
-    """Rough estimate of hover time based on battery capacity."""
-    mah = _extract_number(battery_item.get('specs', {}).get('capacity_mah'), 1300)
-    # Heuristic: Hover amps approx (Weight / 40)
-    # 500g drone -> ~12.5 Amps hover
-    hover_amps = total_weight_g / 40.0
-    if hover_amps <= 0: return 0
-    
-    hours = (mah / 1000.0) / hover_amps
-    return round(hours * 60 * 0.8, 1) # 80% efficiency factor
\ No newline at end of file
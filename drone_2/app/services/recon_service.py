@@ -1,75 +1,358 @@
 # FILE: app/services/recon_service.py
 from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
 from urllib.parse import urljoin
 import asyncio
 import re
-import json
+import orjson
+import time
+from collections import OrderedDict
+import httpx
+from app.config import settings
+
+try:
+    # lexbor (C) parser + CSS engine: no Python object per node
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import diskcache  # SQLite-backed, survives restarts and is shared across workers
+except ImportError:
+    diskcache = None
+
+try:
+    import re2  # google-re2: linear-time DFA matching, no backtracking
+except ImportError:
+    re2 = None
+
+try:
+    import lxml  # noqa: F401  (C parser, several times faster than html.parser)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+# Below this many bytes a 200 response is almost always a JS shell, not a product page
+MIN_STATIC_HTML = 2000
+# Page chrome whose text is never product data
+NOISE_TAGS = frozenset({"script", "style", "nav", "footer", "header", "svg", "iframe", "noscript", "button"})
+# Chromium pages open at once per Scraper (each is tens of MB); finished pages
+# are parked on about:blank and reused instead of closed
+MAX_BROWSER_PAGES = 8
+# Browser requests we never need: we read HTML attributes, not pixels
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media", "stylesheet"})
+TRACKER_HOSTS = ("google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net", "hotjar.com", "klaviyo.com")
+TEXT_TYPES = (NavigableString, CData)  # what get_text() counts; Comment etc. are subclasses, so match exact types
+MAX_PAGE_TEXT = 12000
+PRICE_TEXT_RE = re.compile(r'[\$€£]?\s*(\d+[\.,]\d{2})')
+PRICE_SELECTORS = (
+    ".price", ".product-price", '[data-test="product-price"]',
+    ".price-value", ".price--main .money", ".a-price-whole",
+    ".product-info-price .price",
+)
+PRICE_META_PROPERTIES = ("product:price:amount", "og:price:amount")
+# Runs over up to 25 KB of raw HTML per page that has no structured price
+PRICE_SCAN_RE = (re2 or re).compile(r'[\$€£]?\s*(\d{1,4}[,\.]\d{2})\b')
+
+# Scraped pages, shared by every Scraper (one is opened per fusion search, and
+# the same product URLs come back across optimizer iterations and users).
+# In-process LRU first, then the on-disk cache, then the network.
+SCRAPE_CACHE_SIZE = 512
+SCRAPE_CACHE_TTL_S = 1800
+SCRAPE_DISK_CACHE_BYTES = 2**30
+_page_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_disk_cache = None
+
+def _get_disk_cache():
+    """Opened on first use (not at import), so forked workers each get their own connection."""
+    global _disk_cache
+    if _disk_cache is None and diskcache is not None:
+        _disk_cache = diskcache.Cache(settings.SCRAPE_CACHE_DIR, size_limit=SCRAPE_DISK_CACHE_BYTES)
+    return _disk_cache
 
 class Scraper:
+    """
+    Product page scraper. Pages are first fetched with a plain pooled HTTP
+    client (most shops render server-side); Chromium is only launched, lazily,
+    for pages that come back empty or without product data.
+    """
     def __init__(self):
         self.playwright = None
         self.browser = None
+        self.context = None
+        self._http = None
+        self._browser_lock = asyncio.Lock()
+        self._page_slots = asyncio.Semaphore(MAX_BROWSER_PAGES)
+        self._idle_pages = []
 
     async def __aenter__(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=True)
+        self._http = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+            timeout=10, follow_redirects=True,
+        )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._http: await self._http.aclose()
+        if self.context: await self.context.close()
         if self.browser: await self.browser.close()
         if self.playwright: await self.playwright.stop()
 
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The pooled HTTP client; other services on this loop reuse its connections."""
+        return self._http
+
+    async def _get_context(self):
+        # One context (and cookie jar) for every page this scraper opens
+        async with self._browser_lock:
+            if self.context is None:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=True)
+                self.context = await self.browser.new_context(user_agent=USER_AGENT, java_script_enabled=True)
+                await self.context.route("**/*", self._block)
+            return self.context
+
+    async def new_page(self):
+        """A page from the shared (resource-blocking) browser context."""
+        context = await self._get_context()
+        return await context.new_page()
+
+    async def _acquire_page(self):
+        await self._page_slots.acquire()
+        try:
+            while self._idle_pages:
+                page = self._idle_pages.pop()
+                if not page.is_closed(): return page
+            return await self.new_page()
+        except BaseException:
+            self._page_slots.release()
+            raise
+
+    async def _release_page(self, page):
+        try:
+            if not page.is_closed():
+                await page.goto("about:blank")
+                self._idle_pages.append(page)
+        except Exception:
+            await page.close() # Crashed or wedged: don't pool it
+        finally:
+            self._page_slots.release()
+
+    @staticmethod
+    async def _block(route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in TRACKER_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+
     async def scrape_product_page(self, url: str):
+        cached = _page_cache.get(url)
+        if cached and time.monotonic() - cached[0] < SCRAPE_CACHE_TTL_S:
+            _page_cache.move_to_end(url)
+            return dict(cached[1])
+        disk = _get_disk_cache()
+        result = disk.get(url) if disk is not None else None
+        if result is None:
+            result = await self._scrape(url)
+            if result is not None and disk is not None:
+                disk.set(url, result, expire=SCRAPE_CACHE_TTL_S)
+        if result is not None:
+            _page_cache[url] = (time.monotonic(), dict(result))
+            _page_cache.move_to_end(url)
+            if len(_page_cache) > SCRAPE_CACHE_SIZE:
+                _page_cache.popitem(last=False)
+        return result
+
+    async def _scrape(self, url: str):
         print(f"🕵️  Scraping: {url}")
-        page = await self.browser.new_page()
-        await page.set_extra_http_headers({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        })
+        # 1. Fast path: static HTML over the pooled HTTP client
+        try:
+            response = await self._http.get(url)
+            if response.status_code == 200 and len(response.text) > MIN_STATIC_HTML:
+                result = self._parse_html(response.text, None, str(response.url))
+                if result["title"] and (result["price"] is not None or result["image_url"]):
+                    return result
+        except httpx.HTTPError:
+            pass # Fall through to the browser
+
+        # 2. JS-rendered page: full Chromium render
+        page = await self._acquire_page()
 
         try:
+            # The whole document (price markers in <head>, image and spec tables
+            # in <body>) is parsed by DOMContentLoaded; cheap with heavy resources blocked
             await page.goto(url, timeout=30000, wait_until="domcontentloaded")
             title = await page.title()
             content = await page.content()
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            price = self._extract_price(soup, content) # Pass full content for regex
-
-            for tag in soup(["script", "style", "nav", "footer", "header", "svg", "iframe", "noscript", "button"]):
-                tag.decompose()
-            
-            spec_text = ""
-            for table in soup.find_all("table"):
-                spec_text += table.get_text(separator=" | ", strip=True) + "\n"
-            for ul in soup.find_all("ul"):
-                spec_text += ul.get_text(separator="\n", strip=True) + "\n"
-
-            if len(spec_text) < 50:
-                spec_text += soup.get_text(separator=' ', strip=True)
-
-            clean_text = " ".join(spec_text.split())[:12000] 
-            
-            image_url = self._find_best_image(soup, page.url)
-            
-            return {
-                "title": title,
-                "text": clean_text,
-                "image_url": image_url,
-                "price": price
-            }
+            return self._parse_html(content, title, page.url)
 
         except Exception as e:
             print(f"❌ Scrape Error ({url}): {e}")
             return None
         finally:
-            await page.close()
+            await self._release_page(page)
+
+    def _parse_html(self, content, title, base_url):
+        if LexborHTMLParser is not None:
+            return self._parse_tree(LexborHTMLParser(content), content, title, base_url)
+        return self._parse_page(BeautifulSoup(content, HTML_PARSER), content, title, base_url)
+
+    def _page_result(self, scan, price, title, base_url):
+        if title is None:
+            title = scan["title"]
+
+        spec_text = scan["spec_text"]
+        if len(spec_text) < 50:
+            spec_text = f"{spec_text} {scan['page_text']}"
+
+        clean_text = " ".join(spec_text.split())[:MAX_PAGE_TEXT]
 
-    def _extract_price(self, soup, content_str):
+        image_url = self._find_best_image(scan, base_url)
+
+        return {
+            "title": title,
+            "text": clean_text,
+            "image_url": image_url,
+            "price": price
+        }
+
+    # --- selectolax / lexbor ---
+    def _parse_tree(self, tree, content, title, base_url):
+        """Same result and strategy order as _parse_page, on a lexbor tree."""
+        scan = {"title": "", "ld_json": [], "meta_price": {},
+                "landing_img": None, "photo_img": None, "fallback_img": None}
+        title_node = tree.css_first("title")
+        if title_node: scan["title"] = title_node.text(strip=True)
+        scan["ld_json"] = [node.text() for node in tree.css('script[type="application/ld+json"]')]
+        for prop in PRICE_META_PROPERTIES:
+            node = tree.css_first(f'meta[property="{prop}"]')
+            if node: scan["meta_price"][prop] = node.attributes.get("content")
+
+        def price_text(selector):
+            node = tree.css_first(selector)
+            return node.text(strip=True) if node else None
+        price = self._extract_price(price_text, content, scan) # Pass full content for regex
+
+        # CSS price lookups are done; now drop the page chrome for text and images
+        tree.strip_tags(list(NOISE_TAGS))
+
+        specs, spec_len = [], 0
+        for node in tree.css("table, ul"):
+            if spec_len >= MAX_PAGE_TEXT: break
+            block = " ".join(self._lexbor_text(node, " | " if node.tag == "table" else "\n").split())
+            specs.append(block)
+            spec_len += len(block) + 1
+        scan["spec_text"] = "\n".join(specs)
+        scan["page_text"] = ""
+        if len(scan["spec_text"]) < 50 and tree.root is not None:
+            scan["page_text"] = tree.root.text(separator=" ", strip=True)[:MAX_PAGE_TEXT * 2]
+
+        for key, selector in (("landing_img", "img#landingImage"), ("photo_img", "img.product-image-photo")):
+            node = tree.css_first(selector)
+            if node: scan[key] = node.attributes.get("data-src") or node.attributes.get("src")
+        for node in tree.css("img"):
+            src = node.attributes.get("src")
+            if self._is_product_image(src):
+                scan["fallback_img"] = src
+                break
+
+        return self._page_result(scan, price, title, base_url)
+
+    @staticmethod
+    def _lexbor_text(node, separator):
+        # text(strip=True) keeps the empty pieces between separators; drop
+        # them like BeautifulSoup's get_text(strip=True) does
+        return separator.join(piece for piece in node.text(separator="\x00", strip=True).split("\x00") if piece)
+
+    # --- BeautifulSoup (fallback when selectolax is not installed) ---
+    def _parse_page(self, soup, content, title, base_url):
+        scan = self._scan_page(soup)
+
+        def price_text(selector):
+            element = soup.select_one(selector)
+            return element.get_text(strip=True) if element else None
+        price = self._extract_price(price_text, content, scan) # Pass full content for regex
+
+        return self._page_result(scan, price, title, base_url)
+
+    def _scan_page(self, soup):
+        """
+        One document-order walk that collects everything _parse_page needs:
+        title, JSON-LD blocks, price meta tags, table/list text, image
+        candidates and (capped) visible text. NOISE_TAGS subtrees are skipped
+        instead of decomposed, so the tree stays intact for CSS selectors.
+        """
+        scan = {
+            "title": "", "ld_json": [], "meta_price": {},
+            "landing_img": None, "photo_img": None, "fallback_img": None,
+        }
+        specs, spec_len = [], 0
+        texts, text_len = [], 0
+
+        stack = [iter(soup.contents)]
+        while stack:
+            for node in stack[-1]:
+                if isinstance(node, Tag):
+                    name = node.name
+                    if name in NOISE_TAGS:
+                        if name == "script" and node.get("type") == "application/ld+json":
+                            # Schema.org blobs run to 100+ KB; .string skips the get_text() walk.
+                            # It is a str subclass (bs4 Script), which orjson rejects, hence str()
+                            scan["ld_json"].append(str(node.string or node.get_text()))
+                        continue
+                    if name == "title" and not scan["title"]:
+                        scan["title"] = node.get_text(strip=True)
+                    elif name == "meta":
+                        prop = node.get("property")
+                        if prop in PRICE_META_PROPERTIES:
+                            scan["meta_price"].setdefault(prop, node.get("content"))
+                    elif name == "img":
+                        self._note_image(scan, node)
+                    elif name in ("table", "ul") and spec_len < MAX_PAGE_TEXT:
+                        sep = " | " if name == "table" else "\n"
+                        block = " ".join(node.get_text(separator=sep, strip=True).split())
+                        specs.append(block)
+                        spec_len += len(block) + 1
+                    stack.append(iter(node.contents))
+                    break
+                if text_len < MAX_PAGE_TEXT and type(node) in TEXT_TYPES:
+                    chunk = node.strip()
+                    if chunk:
+                        texts.append(chunk)
+                        text_len += len(chunk) + 1
+            else:
+                stack.pop()
+
+        scan["spec_text"] = "\n".join(specs)
+        scan["page_text"] = " ".join(texts)
+        return scan
+
+    def _note_image(self, scan, img):
+        if scan["landing_img"] is None and img.get("id") == "landingImage":
+            scan["landing_img"] = img.get("data-src") or img.get("src") or ""
+        if scan["photo_img"] is None and "product-image-photo" in (img.get("class") or ()):
+            scan["photo_img"] = img.get("data-src") or img.get("src") or ""
+        if scan["fallback_img"] is None and self._is_product_image(img.get("src")):
+            scan["fallback_img"] = img.get("src")
+
+    # --- shared ---
+    @staticmethod
+    def _is_product_image(src):
+        if not src or "base64" in src or ".gif" in src: return False
+        lower_src = src.lower()
+        if any(x in lower_src for x in ["logo", "icon", "avatar", "badge", "cart"]): return False
+        return "product" in lower_src or "main" in lower_src or "600" in lower_src
+
+    def _extract_price(self, price_text, content_str, scan):
+        """price_text(selector) returns the stripped text of the first match, or None."""
         # Strategy 1: JSON-LD (Gold Standard)
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
+        for raw in scan["ld_json"]:
             try:
-                data = json.loads(script.get_text())
+                data = orjson.loads(raw)
                 if isinstance(data, list):
                     for item in data:
                         p = self._parse_schema_price(item)
@@ -77,35 +360,30 @@ class Scraper:
                 else:
                     p = self._parse_schema_price(data)
                     if p: return p
-            except: continue
+            except (ValueError, TypeError, AttributeError): continue # bad JSON-LD or unexpected shape
 
         # Strategy 2: Meta Tags
-        meta_price = soup.find("meta", property="product:price:amount") or \
-                     soup.find("meta", property="og:price:amount")
-        if meta_price and meta_price.get("content"): 
-            try: return float(meta_price.get("content"))
-            except: pass
+        meta_price = scan["meta_price"].get("product:price:amount") or \
+                     scan["meta_price"].get("og:price:amount")
+        if meta_price: 
+            try: return float(meta_price)
+            except ValueError: pass
 
         # Strategy 3: Common CSS Selectors (NEW)
-        price_selectors = [
-            ".price", ".product-price", '[data-test="product-price"]',
-            ".price-value", ".price--main .money", ".a-price-whole",
-            ".product-info-price .price",
-        ]
-        for selector in price_selectors:
-            price_element = soup.select_one(selector)
-            if price_element:
-                price_text = price_element.get_text(strip=True)
-                price_match = re.search(r'[\$€£]?\s*(\d+[\.,]\d{2})', price_text)
+        for selector in PRICE_SELECTORS:
+            text = price_text(selector)
+            if text is not None:
+                price_match = PRICE_TEXT_RE.search(text)
                 if price_match:
                     try: return float(price_match.group(1).replace(",", ""))
-                    except: pass
+                    except ValueError: pass
         
         # Strategy 4: Regex Scan on full HTML (Hail Mary)
-        matches = re.findall(r'[\$€£]?\s*(\d{1,4}[,\.]\d{2})\b', content_str[:25000])
-        valid_prices = [float(m.replace(",", "")) for m in matches if 0.5 < float(m.replace(",", "")) < 9999]
-        if valid_prices:
-            return valid_prices[0]
+        # First plausible value wins, so stop scanning there
+        for match in PRICE_SCAN_RE.finditer(content_str[:25000]):
+            value = float(match.group(1).replace(",", ""))
+            if 0.5 < value < 9999:
+                return value
         
         return None
 
@@ -118,31 +396,48 @@ class Scraper:
                 return float(offers[0].get("price"))
         return None
 
-    def _find_best_image(self, soup, base_url):
-        # ... (this function remains the same and is quite robust) ...
-        candidates = [
-            soup.find("img", {"id": "landingImage"}),
-            soup.find("img", {"class": "product-image-photo"}),
-        ]
-        for img in candidates:
-            if img:
-                src = img.get("data-src") or img.get("src")
-                if src: return self._fix_url(src, base_url)
-
-        all_imgs = soup.find_all("img")
-        best_src = None
-        for img in all_imgs:
-            src = img.get("src")
-            if not src or "base64" in src or ".gif" in src: continue
-            lower_src = src.lower()
-            if any(x in lower_src for x in ["logo", "icon", "avatar", "badge", "cart"]): continue
-            if "product" in lower_src or "main" in lower_src or "600" in lower_src:
-                best_src = src
-                break 
+    def _find_best_image(self, scan, base_url):
+        for src in (scan["landing_img"], scan["photo_img"]):
+            if src: return self._fix_url(src, base_url)
+
+        best_src = scan["fallback_img"]
         return self._fix_url(best_src, base_url) if best_src else None
 
     def _fix_url(self, src, base_url):
         if not src: return None
         if src.startswith("//"): return "https:" + src
         if src.startswith("/"): return urljoin(base_url, src)
-        return src
\ No newline at end of file
+        return src
+
+
+# --- SHARED SCRAPER ---
+# One Scraper per event loop, shared by every search running on it: the HTTP
+# pool, the browser and its warm pages are set up once, not per search.
+_shared_scraper = None
+_shared_loop = None
+_shared_lock = None
+_shared_lifetime = None
+
+async def _scraper_lifetime(scraper):
+    # asyncio.run() finalizes async generators before it closes the loop, so
+    # this closes the shared browser together with the loop that owns it
+    try:
+        yield
+    finally:
+        await scraper.__aexit__(None, None, None)
+
+async def get_scraper() -> Scraper:
+    """The running loop's shared Scraper, opened on first use."""
+    global _shared_scraper, _shared_loop, _shared_lock, _shared_lifetime
+    loop = asyncio.get_running_loop()
+    if _shared_loop is not loop:
+        # A new loop (e.g. a Celery task's asyncio.run); the old scraper was closed with its loop
+        _shared_scraper, _shared_loop, _shared_lock, _shared_lifetime = None, loop, asyncio.Lock(), None
+    async with _shared_lock:
+        if _shared_scraper is None:
+            scraper = Scraper()
+            await scraper.__aenter__()
+            lifetime = _scraper_lifetime(scraper)
+            await lifetime.__anext__()
+            _shared_scraper, _shared_lifetime = scraper, lifetime
+    return _shared_scraper
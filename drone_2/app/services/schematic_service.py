@@ -1,121 +1,271 @@
 # FILE: app/services/schematic_service.py
 import os
+import re
+import shutil
+import hashlib
+from types import MappingProxyType
+from html import escape
 try:
     import graphviz
 except ImportError:
     graphviz = None
+try:
+    import cairosvg  # In-process SVG -> PNG (no subprocess)
+except ImportError:
+    cairosvg = None
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "static", "generated")
+# Bump when the diagram layout/styling changes, so cached renders are redrawn
+SCHEMATIC_VERSION = 2
+# The topology is fixed (FC/ESC/battery/4 motors + up to four optional
+# peripherals), so it is drawn from a pre-positioned SVG template. Set
+# USE_GRAPHVIZ=1 to lay it out with Graphviz `dot` instead.
+USE_GRAPHVIZ = os.getenv("USE_GRAPHVIZ", "0") == "1"
+
+# --- SVG TEMPLATE ---
+SVG_WIDTH, SVG_HEIGHT = 960, 560
+SVG_FONT = "Helvetica, Arial, sans-serif"
+EDGE_COLORS = {"default": "#cbd5e0", "power": "#ecc94b", "rx": "#68d391", "vtx": "#fc8181"}
+
+def _svg_box(x, y, w, h, lines, fill="#4a5568", text="white"):
+    rows = "".join(
+        f'<tspan x="{x + w / 2}" dy="{0 if i == 0 else 14}">{escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    first_y = y + h / 2 + 4 - 7 * (len(lines) - 1)
+    return (f'<rect x="{x}" y="{y}" width="{w}" height="{h}" rx="4" fill="{fill}" stroke="#4a5568"/>'
+            f'<text y="{first_y}" fill="{text}" font-size="12" text-anchor="middle">{rows}</text>')
+
+def _svg_circle(cx, cy, r, label):
+    return (f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="#4a5568" stroke="#4a5568"/>'
+            f'<text x="{cx}" y="{cy + 4}" fill="white" font-size="12" text-anchor="middle">{escape(label)}</text>')
+
+def _svg_edge(x1, y1, x2, y2, kind="default", label="", width=1, label_dy=-6):
+    color = EDGE_COLORS[kind]
+    svg = (f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{color}" '
+           f'stroke-width="{width}" marker-end="url(#arrow-{kind})"/>')
+    if label:
+        svg += (f'<text x="{(x1 + x2) / 2}" y="{(y1 + y2) / 2 + label_dy}" fill="#a0aec0" '
+                f'font-size="10" text-anchor="middle">{escape(label)}</text>')
+    return svg
+
+def _svg_bundle(x1, y1, x2, y2, edges):
+    """Parallel labelled wires between two nodes: edges = [(kind, label), ...]."""
+    offset = (len(edges) - 1) / 2
+    return "".join(
+        _svg_edge(x1, y1 + (i - offset) * 10, x2, y2 + (i - offset) * 10, kind, label, label_dy=(i - offset) * 14 - 2)
+        for i, (kind, label) in enumerate(edges)
+    )
 
-def generate_wiring_diagram(project_id: str, bom: list) -> str:
+# Node geometry: core in the middle row, motors below the ESC, peripherals in
+# a column right of the FC wired into its right-hand side
+FC_RIGHT, FC_MID = 700, 278
+PERIPHERAL_X = 790
+
+SVG_HEADER = (
+    f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+    f'width="{SVG_WIDTH}" height="{SVG_HEIGHT}" font-family="{SVG_FONT}">'
+    "<defs>" + "".join(
+        f'<marker id="arrow-{kind}" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="7" '
+        f'markerHeight="7" orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="{color}"/></marker>'
+        for kind, color in EDGE_COLORS.items()
+    ) + "</defs>"
+    f'<rect width="{SVG_WIDTH}" height="{SVG_HEIGHT}" fill="#1a202c"/>'
+)
+SVG_CORE = (
+    _svg_box(30, 250, 120, 56, ["Battery", "(XT60)"], fill="#d69e2e", text="black")
+    + _svg_box(230, 250, 170, 56, ["ESC / Power Board", "(Battery Input)"], fill="#2b6cb0")
+    + _svg_box(520, 250, 180, 56, ["Flight Controller", "(UARTs / 5V / GND)"], fill="#2b6cb0")
+    + _svg_edge(150, 278, 230, 278, "power", "V_BAT (12-25V)", width=2)
+    + _svg_edge(400, 278, 520, 278, "default", "Ribbon Cable", width=2, label_dy=-20)
+    + f'<text x="460" y="266" fill="#a0aec0" font-size="10" text-anchor="middle">{escape("(V_BAT + Current + M1-M4)")}</text>'
+    + "".join(_svg_circle(x, 470, 34, f"Motor {i}") + _svg_edge(315, 306, x, 436)
+              for i, x in enumerate((165, 265, 365, 465), start=1))
+)
+SVG_RX = (
+    _svg_box(PERIPHERAL_X, 40, 150, 56, ["Receiver", "(ELRS/Crossfire)"])
+    + _svg_bundle(PERIPHERAL_X, 68, FC_RIGHT, FC_MID - 14,
+                  [("default", "5V / GND"), ("rx", "TX -> RX1"), ("rx", "RX -> TX1")])
+)
+SVG_VTX_DIGITAL = (
+    _svg_box(PERIPHERAL_X, 170, 150, 56, ["Digital VTX", "(DJI O3 / Vista)"], fill="#e53e3e")
+    + _svg_bundle(PERIPHERAL_X, 198, FC_RIGHT, FC_MID - 4,
+                  [("vtx", "9V / GND"), ("default", "RX -> TX2 (MSP)"), ("default", "TX -> RX2 (MSP)")])
+)
+SVG_VTX_ANALOG = (
+    _svg_box(PERIPHERAL_X, 170, 150, 56, ["Analog VTX"])
+    + _svg_box(PERIPHERAL_X, 300, 150, 56, ["Analog Camera"])
+    + _svg_edge(FC_RIGHT, FC_MID - 8, PERIPHERAL_X, 192, "default", "Video Out (OSD)")
+    + _svg_edge(PERIPHERAL_X, 204, FC_RIGHT, FC_MID + 2, "default", "SmartAudio (TX3)", label_dy=12)
+    + _svg_edge(PERIPHERAL_X, 328, FC_RIGHT, FC_MID + 10, "default", "Video In")
+)
+SVG_GPS = (
+    _svg_box(PERIPHERAL_X, 430, 150, 56, ["GPS Module", "(M10)"])
+    + _svg_bundle(PERIPHERAL_X, 458, FC_RIGHT, FC_MID + 20,
+                  [("default", "5V / GND"), ("default", "TX -> RX4"), ("default", "RX -> TX4")])
+)
+
+def render_wiring_svg(has_rx, has_digital, has_analog, has_gps) -> str:
+    """The wiring diagram as SVG text: string concatenation, no layout engine."""
+    return "".join((
+        SVG_HEADER, SVG_CORE,
+        SVG_RX if has_rx else "",
+        SVG_VTX_DIGITAL if has_digital else "",
+        SVG_VTX_ANALOG if has_analog else "",
+        SVG_GPS if has_gps else "",
+        "</svg>",
+    ))
+
+# Peripheral detection: product-name words (split on anything non-alphanumeric,
+# so "ELRS/Crossfire" and "GPS-M10" both tokenize) matched against these sets
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+RX_KEYWORDS = frozenset({"receiver", "elrs", "crossfire"})
+DIGITAL_VTX_KEYWORDS = frozenset({"dji", "o3", "vista"})
+ANALOG_VTX_KEYWORDS = frozenset({"analog"})
+GPS_KEYWORDS = frozenset({"gps"})
+
+def generate_wiring_diagram(project_id: str, product_names: list) -> str:
     """
-    Generates a wiring schematic PNG based on the specific components sourced.
-    Returns the path to the generated image.
+    Generates a wiring schematic PNG based on the product names sourced
+    (an SVG if cairosvg is not installed). Returns the path to the image.
+
+    The diagram only depends on which peripherals are present, so each
+    combination is rendered once and cached in OUTPUT_DIR; the project's
+    schematic is a link to that render.
     """
-    if not graphviz:
-        print("⚠️ Graphviz not installed. Skipping schematic.")
-        return None
+    # 1. Scan BOM for Peripherals (one tokenizing pass over the product names)
+    tokens = set()
+    for name in product_names:
+        tokens.update(TOKEN_RE.findall((name or "").lower()))
+    has_rx = bool(tokens & RX_KEYWORDS)
+    has_digital = bool(tokens & DIGITAL_VTX_KEYWORDS)
+    has_analog = not has_digital and bool(tokens & ANALOG_VTX_KEYWORDS)
+    has_gps = bool(tokens & GPS_KEYWORDS)
 
-    # 1. Initialize Diagram
-    dot = graphviz.Digraph(comment='Drone Wiring Diagram')
-    dot.attr(rankdir='LR', bgcolor='#1a202c', fontcolor='white')
-    
-    # --- STYLE DEFINITIONS ---
-    # Base Node Style
-    node_attr = {
-        'shape': 'box', 
-        'style': 'filled', 
-        'color': '#4a5568', 
-        'fontcolor': 'white', 
-        'fontname': 'Helvetica'
-    }
-    
-    # Specific Styles to prevent Argument Collision
-    bat_attr = node_attr.copy()
-    bat_attr.update({'fillcolor': '#d69e2e', 'fontcolor': 'black'})
-    
-    motor_attr = node_attr.copy()
-    motor_attr.update({'shape': 'circle', 'width': '1', 'fixedsize': 'true'})
-
-    # Edge Styles
-    edge_attr = {
-        'color': '#cbd5e0', 
-        'fontcolor': '#a0aec0', 
-        'fontsize': '10'
-    }
-    
-    pwr_edge_attr = edge_attr.copy()
-    pwr_edge_attr.update({'color': '#ecc94b', 'penwidth': '2'})
+    renderer = "graphviz" if USE_GRAPHVIZ else "svg"
+    ext = ".svg" if renderer == "svg" and not cairosvg else ".png"
+    features = (SCHEMATIC_VERSION, renderer, has_rx, has_digital, has_analog, has_gps)
+    key = hashlib.blake2b(repr(features).encode(), digest_size=8).hexdigest()
+    cached_path = os.path.join(OUTPUT_DIR, f"schematic_{key}{ext}")
+    output_path = os.path.join(OUTPUT_DIR, f"{project_id}_schematic{ext}")
+
+    if not os.path.exists(cached_path):
+        # Written under a private name, then swapped in whole so a
+        # concurrent build never links a half-written file
+        tmp_base = f"{cached_path[:-len(ext)]}.{os.getpid()}"
+        if renderer == "svg":
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            svg = render_wiring_svg(has_rx, has_digital, has_analog, has_gps)
+            if cairosvg:
+                cairosvg.svg2png(bytestring=svg.encode(), write_to=tmp_base + ext)
+            else:
+                with open(tmp_base + ext, "w", encoding="utf-8") as f: f.write(svg)
+            os.replace(tmp_base + ext, cached_path)
+        else:
+            if not graphviz:
+                print("⚠️ Graphviz not installed. Skipping schematic.")
+                return None
+            dot = _build_diagram(has_rx, has_digital, has_analog, has_gps)
+            try:
+                # Renders to .png
+                rendered = dot.render(filename=tmp_base, format='png', cleanup=True)
+                os.replace(rendered, cached_path)
+            except Exception as e:
+                print(f"❌ Graphviz Error: {e}")
+                return None
 
-    ribbon_edge_attr = edge_attr.copy()
-    ribbon_edge_attr.update({'penwidth': '2'})
+    _link_render(cached_path, output_path)
+    print(f"⚡ Schematic Generated: {output_path}")
+    return output_path
 
-    rx_edge_attr = edge_attr.copy()
-    rx_edge_attr.update({'color': '#68d391'}) # Green
+def _link_render(cached_path, dest):
+    if os.path.lexists(dest): os.remove(dest)
+    try:
+        os.link(cached_path, dest)
+    except OSError:
+        shutil.copyfile(cached_path, dest)
 
-    vtx_edge_attr = edge_attr.copy()
-    vtx_edge_attr.update({'color': '#fc8181'}) # Red
+# --- GRAPHVIZ STYLE DEFINITIONS ---
+# Built once at import and read-only; each style is spread into node()/edge()
+# Base Node Style
+_NODE_ATTR = MappingProxyType({
+    'shape': 'box', 
+    'style': 'filled', 
+    'color': '#4a5568', 
+    'fontcolor': 'white', 
+    'fontname': 'Helvetica'
+})
+# Specific Styles to prevent Argument Collision
+_CORE_ATTR = MappingProxyType({**_NODE_ATTR, 'fillcolor': '#2b6cb0'}) # Blue
+_DIGITAL_VTX_ATTR = MappingProxyType({**_NODE_ATTR, 'fillcolor': '#e53e3e'}) # Red
+_BAT_ATTR = MappingProxyType({**_NODE_ATTR, 'fillcolor': '#d69e2e', 'fontcolor': 'black'})
+_MOTOR_ATTR = MappingProxyType({**_NODE_ATTR, 'shape': 'circle', 'width': '1', 'fixedsize': 'true'})
 
+# Edge Styles
+_EDGE_ATTR = MappingProxyType({
+    'color': '#cbd5e0', 
+    'fontcolor': '#a0aec0', 
+    'fontsize': '10'
+})
+_PWR_EDGE_ATTR = MappingProxyType({**_EDGE_ATTR, 'color': '#ecc94b', 'penwidth': '2'})
+_RIBBON_EDGE_ATTR = MappingProxyType({**_EDGE_ATTR, 'penwidth': '2'})
+_RX_EDGE_ATTR = MappingProxyType({**_EDGE_ATTR, 'color': '#68d391'}) # Green
+_VTX_EDGE_ATTR = MappingProxyType({**_EDGE_ATTR, 'color': '#fc8181'}) # Red
+
+def _build_diagram(has_rx, has_digital, has_analog, has_gps):
+    # 2. Initialize Diagram
+    dot = graphviz.Digraph(comment='Drone Wiring Diagram')
+    dot.attr(rankdir='LR', bgcolor='#1a202c', fontcolor='white')
+    
     # 2. Central Core (Always present)
-    dot.node('FC', 'Flight Controller\n(UARTs / 5V / GND)', **node_attr, fillcolor='#2b6cb0') # Blue
-    dot.node('ESC', 'ESC / Power Board\n(Battery Input)', **node_attr, fillcolor='#2b6cb0')
-    dot.node('BAT', 'Battery\n(XT60)', **bat_attr) 
+    dot.node('FC', 'Flight Controller\n(UARTs / 5V / GND)', **_CORE_ATTR)
+    dot.node('ESC', 'ESC / Power Board\n(Battery Input)', **_CORE_ATTR)
+    dot.node('BAT', 'Battery\n(XT60)', **_BAT_ATTR) 
     
     # Core Power Links
-    dot.edge('BAT', 'ESC', label='V_BAT (12-25V)', **pwr_edge_attr)
-    dot.edge('ESC', 'FC', label='Ribbon Cable\n(V_BAT + Current + M1-M4)', **ribbon_edge_attr)
+    dot.edge('BAT', 'ESC', label='V_BAT (12-25V)', **_PWR_EDGE_ATTR)
+    dot.edge('ESC', 'FC', label='Ribbon Cable\n(V_BAT + Current + M1-M4)', **_RIBBON_EDGE_ATTR)
 
-    # 3. Scan BOM for Peripherals
-    bom_text = str(bom).lower()
-    
+    # 3. Peripherals
     # --- Receiver (ELRS/Crossfire) ---
-    if 'receiver' in bom_text or 'elrs' in bom_text:
-        dot.node('RX', 'Receiver\n(ELRS/Crossfire)', **node_attr)
-        dot.edge('RX', 'FC', label='5V / GND', **edge_attr)
-        dot.edge('RX', 'FC', label='TX -> RX1', **rx_edge_attr)
-        dot.edge('RX', 'FC', label='RX -> TX1', **rx_edge_attr)
+    if has_rx:
+        dot.node('RX', 'Receiver\n(ELRS/Crossfire)', **_NODE_ATTR)
+        dot.edge('RX', 'FC', label='5V / GND', **_EDGE_ATTR)
+        dot.edge('RX', 'FC', label='TX -> RX1', **_RX_EDGE_ATTR)
+        dot.edge('RX', 'FC', label='RX -> TX1', **_RX_EDGE_ATTR)
 
     # --- Video System (Analog vs Digital) ---
-    if 'dji' in bom_text or 'o3' in bom_text or 'vista' in bom_text:
-        dot.node('VTX', 'Digital VTX\n(DJI O3 / Vista)', **node_attr, fillcolor='#e53e3e') # Red
-        dot.edge('VTX', 'FC', label='9V / GND', **vtx_edge_attr)
-        dot.edge('VTX', 'FC', label='RX -> TX2 (MSP)', **edge_attr)
-        dot.edge('VTX', 'FC', label='TX -> RX2 (MSP)', **edge_attr)
-    elif 'analog' in bom_text:
-        dot.node('CAM', 'Analog Camera', **node_attr)
-        dot.node('VTX', 'Analog VTX', **node_attr)
-        dot.edge('CAM', 'FC', label='Video In', **edge_attr)
-        dot.edge('FC', 'VTX', label='Video Out (OSD)', **edge_attr)
-        dot.edge('VTX', 'FC', label='SmartAudio (TX3)', **edge_attr)
+    if has_digital:
+        dot.node('VTX', 'Digital VTX\n(DJI O3 / Vista)', **_DIGITAL_VTX_ATTR)
+        dot.edge('VTX', 'FC', label='9V / GND', **_VTX_EDGE_ATTR)
+        dot.edge('VTX', 'FC', label='RX -> TX2 (MSP)', **_EDGE_ATTR)
+        dot.edge('VTX', 'FC', label='TX -> RX2 (MSP)', **_EDGE_ATTR)
+    elif has_analog:
+        dot.node('CAM', 'Analog Camera', **_NODE_ATTR)
+        dot.node('VTX', 'Analog VTX', **_NODE_ATTR)
+        dot.edge('CAM', 'FC', label='Video In', **_EDGE_ATTR)
+        dot.edge('FC', 'VTX', label='Video Out (OSD)', **_EDGE_ATTR)
+        dot.edge('VTX', 'FC', label='SmartAudio (TX3)', **_EDGE_ATTR)
 
     # --- GPS ---
-    if 'gps' in bom_text:
-        dot.node('GPS', 'GPS Module\n(M10)', **node_attr)
-        dot.edge('GPS', 'FC', label='5V / GND', **edge_attr)
-        dot.edge('GPS', 'FC', label='TX -> RX4', **edge_attr)
-        dot.edge('GPS', 'FC', label='RX -> TX4', **edge_attr)
+    if has_gps:
+        dot.node('GPS', 'GPS Module\n(M10)', **_NODE_ATTR)
+        dot.edge('GPS', 'FC', label='5V / GND', **_EDGE_ATTR)
+        dot.edge('GPS', 'FC', label='TX -> RX4', **_EDGE_ATTR)
+        dot.edge('GPS', 'FC', label='RX -> TX4', **_EDGE_ATTR)
 
     # --- Motors ---
-    # Using the specific motor_attr to avoid 'shape' collision
-    dot.node('M1', 'Motor 1', **motor_attr)
-    dot.node('M2', 'Motor 2', **motor_attr)
-    dot.node('M3', 'Motor 3', **motor_attr)
-    dot.node('M4', 'Motor 4', **motor_attr)
+    # Using the specific _MOTOR_ATTR to avoid 'shape' collision
+    dot.node('M1', 'Motor 1', **_MOTOR_ATTR)
+    dot.node('M2', 'Motor 2', **_MOTOR_ATTR)
+    dot.node('M3', 'Motor 3', **_MOTOR_ATTR)
+    dot.node('M4', 'Motor 4', **_MOTOR_ATTR)
     
-    dot.edge('ESC', 'M1', **edge_attr)
-    dot.edge('ESC', 'M2', **edge_attr)
-    dot.edge('ESC', 'M3', **edge_attr)
-    dot.edge('ESC', 'M4', **edge_attr)
+    dot.edge('ESC', 'M1', **_EDGE_ATTR)
+    dot.edge('ESC', 'M2', **_EDGE_ATTR)
+    dot.edge('ESC', 'M3', **_EDGE_ATTR)
+    dot.edge('ESC', 'M4', **_EDGE_ATTR)
 
-    # 4. Render
-    output_path_base = os.path.join(OUTPUT_DIR, f"{project_id}_schematic")
-    try:
-        # Renders to .png
-        final_path = dot.render(filename=output_path_base, format='png', cleanup=True)
-        print(f"⚡ Schematic Generated: {final_path}")
-        return final_path
-    except Exception as e:
-        print(f"❌ Graphviz Error: {e}")
-        return None
\ No newline at end of file
+    return dot
@@ -1,8 +1,33 @@
 # FILE: app/services/search_service.py
-from googleapiclient.discovery import build
+import asyncio
+import httpx
 from app.config import settings
+from app.services.recon_service import get_scraper
 
-def find_components(query: str, limit: int = 5) -> list[dict]:
+# Custom Search JSON API, called directly over the shared async HTTP pool
+CSE_URL = "https://www.googleapis.com/customsearch/v1"
+CSE_MAX_RESULTS = 10 # API Max is 10
+# Rate-limit / transient server errors are retried with exponential backoff
+CSE_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+CSE_MAX_ATTEMPTS = 4
+CSE_BACKOFF_S = 0.5
+
+async def _cse_request(params: dict) -> dict:
+    client = (await get_scraper()).http
+    for attempt in range(CSE_MAX_ATTEMPTS):
+        try:
+            response = await client.get(CSE_URL, params=params)
+            if response.status_code not in CSE_RETRY_STATUSES:
+                response.raise_for_status()
+                return response.json()
+            error = httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+        except httpx.TransportError as e:
+            error = e
+        if attempt + 1 < CSE_MAX_ATTEMPTS:
+            await asyncio.sleep(CSE_BACKOFF_S * 2**attempt)
+    raise error
+
+async def find_components(query: str, limit: int = 5) -> list[dict]:
     """
     Searches Google Custom Search API for drone components.
     Attempts to extract Product data (Price, Image) from PageMap (Rich Snippets).
@@ -14,16 +39,15 @@ def find_components(query: str, limit: int = 5) -> list[dict]:
     print(f"🔎 Google Search: '{query}'...")
 
     try:
-        service = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY)
-        
         # Append 'buy' or 'price' to ensure we get e-commerce results if not present
         search_query = query if "buy" in query or "price" in query else f"{query} buy"
 
-        res = service.cse().list(
-            q=search_query,
-            cx=settings.GOOGLE_SEARCH_ENGINE_ID,
-            num=limit if limit <= 10 else 10 # API Max is 10
-        ).execute()
+        res = await _cse_request({
+            "key": settings.GOOGLE_API_KEY,
+            "cx": settings.GOOGLE_SEARCH_ENGINE_ID,
+            "q": search_query,
+            "num": min(limit, CSE_MAX_RESULTS),
+        })
 
         results = []
         items = res.get("items", [])
@@ -1,6 +1,6 @@
 # FILE: app/services/software_service.py
 from app.services.ai_service import call_llm_for_json
-from app.prompts import SOFTWARE_ARCHITECT_INSTRUCTION
+from app.prompts import load_prompt
 import json
 
 async def design_compute_stack(mission_profile):
@@ -13,7 +13,7 @@ async def design_compute_stack(mission_profile):
     
     compute_plan = await call_llm_for_json(
         f"MISSION: {mission_desc}", 
-        SOFTWARE_ARCHITECT_INSTRUCTION
+        load_prompt("SOFTWARE_ARCHITECT_INSTRUCTION")
     )
     
     if not compute_plan:
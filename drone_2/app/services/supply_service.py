@@ -15,7 +15,7 @@ class SupplyService:
                 with open(ARSENAL_FILE, "r") as f:
                     data = json.load(f)
                     return data.get("components", [])
-            except: 
+            except (OSError, ValueError): # missing/corrupt arsenal file
                 pass
         return []
 
@@ -1,16 +1,93 @@
 # FILE: app/services/vision_service.py
+import asyncio
 import google.generativeai as genai
 import PIL.Image
-import requests
 from io import BytesIO
 from app.config import settings
+from app.services.recon_service import get_scraper
+import ast
 import json
 import re
 
+try:
+    import json5  # Lenient fallback: single quotes, trailing commas, comments
+except ImportError:
+    json5 = None
+
+# Gemini bills images per 768px tile, so product photos are shrunk to fit in
+# about one tile and re-encoded as JPEG before they are sent
+VISION_MAX_EDGE_PX = 896
+VISION_JPEG_QUALITY = 80
+# Images per batched Gemini request (accuracy drops off past this)
+VISION_BATCH_MAX = 16
+
+# Pre-filter: hero/banner art never carries readable specs (the prompt asks for
+# nulls on marketing photos), so those images skip the model call entirely.
+# Main product shots (/products/ on most shop CDNs) are what we verify, so they
+# are not filtered by path.
+TECHNICAL_URL_RE = re.compile(r"datasheet|diagram|dimension|drawing|pinout|spec|\.pdf", re.IGNORECASE)
+MARKETING_URL_RE = re.compile(r"/(?:hero|banners?|lifestyle|slideshow|carousel)[/_-]", re.IGNORECASE)
+SKIPPED_MARKETING = {"skipped": "marketing_photo"}
+
+# Model replies: the first JSON value is decoded in place, whatever surrounds it
+MARKDOWN_FENCE_RE = re.compile(r"^```(?:json)?|```$", re.MULTILINE)
+_JSON_DECODER = json.JSONDecoder()
+
 # Configure API (unchanged)
 if settings.GOOGLE_API_KEY:
     genai.configure(api_key=settings.GOOGLE_API_KEY)
 
+def _prepare_image(img: PIL.Image.Image) -> PIL.Image.Image:
+    """Downscales to VISION_MAX_EDGE_PX on the long edge and re-encodes as RGB JPEG."""
+    original_size = img.size
+    img.thumbnail((VISION_MAX_EDGE_PX, VISION_MAX_EDGE_PX), PIL.Image.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=VISION_JPEG_QUALITY)
+    print(f"   🖼️  Image {original_size[0]}x{original_size[1]} -> {img.size[0]}x{img.size[1]} ({buf.tell() // 1024} KB JPEG)")
+    buf.seek(0)
+    return PIL.Image.open(buf)
+
+def _decode_lenient(raw_text: str, opener: str = "{"):
+    """
+    The first JSON object (or array, opener="[") in a model reply, decoded in one pass.
+    Falls back to json5, then to Python-literal syntax ('quotes', True/None),
+    instead of rewriting the text. Raises json.JSONDecodeError if nothing parses.
+    """
+    text = MARKDOWN_FENCE_RE.sub("", raw_text.strip())
+    start = text.find(opener)
+    if start == -1:
+        raise json.JSONDecodeError(f"No {opener!r} in response", text, 0)
+    try:
+        return _JSON_DECODER.raw_decode(text, start)[0]
+    except json.JSONDecodeError as e:
+        error = e
+    candidate = text[start:text.rfind("}" if opener == "{" else "]") + 1]
+    if json5 is not None:
+        try:
+            return json5.loads(candidate)
+        except ValueError:
+            pass
+    try:
+        return ast.literal_eval(candidate)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        raise error
+
+def _is_marketing_photo(image_url: str) -> bool:
+    """True when the URL marks the image as marketing art (never by shape:
+    props, batteries and frames are legitimately long and thin)."""
+    if TECHNICAL_URL_RE.search(image_url):
+        return False
+    return MARKETING_URL_RE.search(image_url) is not None
+
+async def _download_image(image_url: str) -> PIL.Image.Image:
+    # Over the shared async HTTP pool, without blocking the loop
+    client = (await get_scraper()).http
+    response = await client.get(image_url, timeout=15)
+    response.raise_for_status()
+    return _prepare_image(PIL.Image.open(BytesIO(response.content)))
+
 # =====================================================================
 # REFACTORED AND GENERALIZED FUNCTION FOR TASK 2.2
 # =====================================================================
@@ -31,13 +108,13 @@ async def analyze_image_for_specs(image_url: str, part_type: str, dynamic_prompt
         A dictionary of the extracted specifications, or None on failure.
     """
     print(f"👁️  Vision AI Analyzing ({part_type}): {image_url}")
+    if _is_marketing_photo(image_url):
+        print("   ⏭️  Marketing photo, skipping Vision AI.")
+        return dict(SKIPPED_MARKETING)
     
-    # 1. Download Image (unchanged)
+    # 1. Download Image
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(image_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        img = PIL.Image.open(BytesIO(response.content))
+        img = await _download_image(image_url)
     except Exception as e:
         print(f"   ❌ Image Download Error: {e}")
         return {"error": "download_failed", "details": str(e)}
@@ -65,18 +142,7 @@ async def analyze_image_for_specs(image_url: str, part_type: str, dynamic_prompt
         if not raw_text:
             return {"error": "empty_response"}
 
-        # Use the same robust JSON parsing from ai_service
-        match = re.search(r"```(json)?\s*({.*})\s*```", raw_text, re.DOTALL)
-        json_str = match.group(2) if match else raw_text
-        if not match:
-            start, end = raw_text.find("{"), raw_text.rfind("}") + 1
-            if start != -1 and end != -1:
-                json_str = raw_text[start:end]
-
-        # Cleanup common AI syntax errors before parsing
-        json_str = json_str.replace("True", "true").replace("False", "false").replace("None", "null").replace("'", '"')
-        
-        parsed_json = json.loads(json_str)
+        parsed_json = _decode_lenient(raw_text)
         print(f"   ✅ Vision AI extracted: {parsed_json}")
         return parsed_json
         
@@ -85,4 +151,86 @@ async def analyze_image_for_specs(image_url: str, part_type: str, dynamic_prompt
         return {"error": "json_parse_error", "raw_output": raw_text}
     except Exception as e:
         print(f"   ❌ Vision Processing Error: {e}")
-        return {"error": "vision_api_error", "details": str(e)}
\ No newline at end of file
+        return {"error": "vision_api_error", "details": str(e)}
+
+async def analyze_images_batch(items: list[tuple[str, str]], dynamic_prompt_object: dict) -> list[dict]:
+    """
+    Batched analyze_image_for_specs: every image goes to Gemini in ONE request.
+
+    Args:
+        items: (image_url, part_type) pairs, at most VISION_BATCH_MAX.
+        dynamic_prompt_object: As for analyze_image_for_specs; applied to every image.
+
+    Returns:
+        One result per item, in order: the extracted specs, an {"error": ...} dict,
+        or SKIPPED_MARKETING for images not worth a model call.
+    """
+    items = items[:VISION_BATCH_MAX]
+    print(f"👁️  Vision AI Analyzing {len(items)} images in one request...")
+    results = [None] * len(items)
+    fetch = []
+    for i, (url, _) in enumerate(items):
+        if _is_marketing_photo(url):
+            results[i] = dict(SKIPPED_MARKETING)
+        else:
+            fetch.append(i)
+
+    # 1. Download the remaining images concurrently
+    fetched = await asyncio.gather(*(_download_image(items[i][0]) for i in fetch), return_exceptions=True)
+    downloads = dict(zip(fetch, fetched))
+    batch = []  # indices of images that made it into the request
+    for i, img in downloads.items():
+        if isinstance(img, Exception):
+            print(f"   ❌ Image Download Error ({items[i][0]}): {img}")
+            results[i] = {"error": "download_failed", "details": str(img)}
+        else:
+            batch.append(i)
+    skipped = sum(1 for r in results if r and r.get("skipped"))
+    if skipped:
+        print(f"   ⏭️  Skipped {skipped} marketing photos.")
+    if not batch:
+        return results
+
+    # 2. One prompt, images numbered in the order the answers must come back
+    prompt_text = dynamic_prompt_object.get("prompt_text", "Analyze the image.")
+    json_schema = dynamic_prompt_object.get("json_schema", "{}")
+    full_prompt = f"""
+    {prompt_text}
+
+    You are given {len(batch)} images, labelled IMAGE 0 to IMAGE {len(batch) - 1}. Analyze each one independently.
+    Your entire response MUST be ONLY a JSON array with exactly {len(batch)} objects, the object at index N describing IMAGE N and adhering strictly to the schema. Do not include markdown formatting or any other text.
+
+    SCHEMA (per image):
+    {json_schema}
+    """
+    contents = [full_prompt]
+    for n, i in enumerate(batch):
+        contents += [f"IMAGE {n} ({items[i][1]}):", downloads[i]]
+
+    # 3. Call Gemini Vision
+    raw_text = ""
+    try:
+        model = genai.GenerativeModel('gemini-2.5-pro')
+        response = await model.generate_content_async(contents)
+        raw_text = response.text
+        if not raw_text:
+            batch_error = {"error": "empty_response"}
+        else:
+            parsed = _decode_lenient(raw_text, opener="[")
+            if not isinstance(parsed, list):
+                raise json.JSONDecodeError("Expected a JSON array", raw_text, 0)
+            for n, i in enumerate(batch):
+                entry = parsed[n] if n < len(parsed) else None
+                results[i] = entry if isinstance(entry, dict) else {"error": "missing_from_batch"}
+            print(f"   ✅ Vision AI extracted specs for {sum(1 for i in batch if 'error' not in results[i])}/{len(batch)} images")
+            return results
+    except json.JSONDecodeError as e:
+        print(f"   ❌ Vision JSON Parse Error: {e}. Raw Output: {raw_text}")
+        batch_error = {"error": "json_parse_error", "raw_output": raw_text}
+    except Exception as e:
+        print(f"   ❌ Vision Processing Error: {e}")
+        batch_error = {"error": "vision_api_error", "details": str(e)}
+
+    for i in batch:
+        results[i] = dict(batch_error)
+    return results
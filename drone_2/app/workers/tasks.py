@@ -1,21 +1,23 @@
 #
 # FILE: app/workers/tasks.py
 import asyncio
-import json
 import os
+import threading
+import orjson
 from datetime import datetime
-from celery import shared_task, chord
+from celery import shared_task, chain
+from celery.signals import worker_init
 from celery.utils.log import get_task_logger
 
 # Import Services
 from app.services.ai_service import (
     analyze_user_requirements, 
-    refine_requirements, 
-    generate_spec_sheet, 
+    refine_and_spec, 
     generate_assembly_instructions,
     optimize_specs
 )
 from app.services.fusion_service import fuse_component_data
+from app.services import physics_service, cad_service, geometry_sim_service
 from app.services.physics_service import run_physics_simulation
 from app.services.cad_service import generate_assets
 from app.services.geometry_sim_service import run_geometric_simulation
@@ -24,11 +26,49 @@ from app.services.cost_service import generate_procurement_manifest
 
 logger = get_task_logger(__name__)
 
+# Optimizer passes replacing at most this many parts re-source them inside
+# the running task instead of queuing a sourcing task through the broker
+INLINE_RESOURCE_MAX = 2
+
+# --- JIT WARM-UP ---
+@worker_init.connect
+def _warm_kernels(**kwargs):
+    """Compiles the numba kernels in the worker parent, so forked children start hot."""
+    for module in (physics_service, cad_service, geometry_sim_service):
+        module.warm_kernels()
+
+# --- FILE WRITES ---
+def _write_file(path: str, payload: bytes):
+    try:
+        # Private temp name, then swapped in whole: readers never see a partial record
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Failed to write {path}: {e}")
+
 # --- HELPER: ASYNC BRIDGE ---
 def run_async(coro):
     """Helper to run async service calls inside sync Celery workers"""
     return asyncio.run(coro)
 
+async def _intake(user_prompt: str, user_answers: list):
+    """Analysis -> refinement/spec sheet, chained on one event loop."""
+    analysis = await analyze_user_requirements(user_prompt)
+    # Refinement + spec sheet in a single LLM round-trip
+    final_plan, spec_sheet = await refine_and_spec(analysis, user_answers)
+    return analysis, final_plan, spec_sheet
+
+async def _document(project_id: str, current_bom: list, doc_context: dict):
+    """Assembly guide (LLM) with the schematic and cost manifest built alongside it."""
+    product_names = [p.get('product_name') or '' for p in current_bom]
+    return await asyncio.gather(
+        generate_assembly_instructions(doc_context),
+        asyncio.to_thread(generate_wiring_diagram, project_id, product_names),
+        asyncio.to_thread(generate_procurement_manifest, current_bom),
+    )
+
 @shared_task(bind=True)
 def start_drone_build(self, user_prompt: str, user_answers: list = None):
     """
@@ -39,29 +79,17 @@ def start_drone_build(self, user_prompt: str, user_answers: list = None):
     """
     logger.info(f"🚀 Starting Build: {user_prompt}")
     
-    # 1. Intake & Engineering
-    analysis = run_async(analyze_user_requirements(user_prompt))
+    # 1. Intake & Engineering (refined with answers, or defaults)
+    analysis, final_plan, spec_sheet = run_async(_intake(user_prompt, user_answers or []))
+    final_plan, spec_sheet = final_plan or {}, spec_sheet or {}
     
-    # Refine with answers (or defaults)
-    final_plan = run_async(refine_requirements(analysis, user_answers or []))
-    spec_sheet = run_async(generate_spec_sheet(final_plan))
-    
-    # 2. Prepare Sourcing Tasks
+    # 2. Prepare Sourcing: every part is searched concurrently inside ONE task
     buy_list = spec_sheet.get("buy_list", [])
-    header_task_signatures = []
-    
-    for item in buy_list:
-        # Create a signature for parallel execution
-        header_task_signatures.append(
-            source_component_task.s(
-                item['part_type'], 
-                item['search_query']
-            )
-        )
+    searches = [(item['part_type'], item['search_query']) for item in buy_list]
     
     # 3. Execute Parallel Sourcing -> Then Run Validation
-    workflow = chord(
-        header_task_signatures,
+    workflow = chain(
+        source_components_batch.s(searches),
         validate_and_finalize_build.s(
             project_context={
                 "project_id": self.request.id or "manual_run",
@@ -73,13 +101,11 @@ def start_drone_build(self, user_prompt: str, user_answers: list = None):
     )
     return workflow.apply_async()
 
-@shared_task
-def source_component_task(part_type: str, query: str):
-    """Individual worker task to find ONE part."""
+async def _source_part(part_type: str, query: str):
     logger.info(f"🔎 Sourcing: {part_type} - {query}")
     try:
         # Run the Fusion Service
-        result = run_async(fuse_component_data(part_type, query))
+        result = await fuse_component_data(part_type, query)
         if not result:
             # Fallback structure if not found
             return {"part_type": part_type, "status": "failed", "search_query": query}
@@ -88,6 +114,24 @@ def source_component_task(part_type: str, query: str):
         logger.error(f"Error sourcing {part_type}: {e}")
         return {"part_type": part_type, "status": "error", "error": str(e)}
 
+async def _source_parts(searches: list):
+    """Several (part_type, query) searches concurrently on one event loop."""
+    return list(await asyncio.gather(*(_source_part(part_type, query) for part_type, query in searches)))
+
+@shared_task
+def source_component_task(part_type: str, query: str):
+    """Individual worker task to find ONE part."""
+    return run_async(_source_part(part_type, query))
+
+@shared_task
+def source_components_batch(searches: list):
+    """
+    Finds every (part_type, query) part in one task: the searches share the
+    worker's event loop, HTTP pool and browser instead of one task each.
+    Results come back in input order, in source_component_task's format.
+    """
+    return run_async(_source_parts(searches))
+
 @shared_task
 def validate_and_finalize_build(bom_results, project_context):
     """
@@ -123,21 +167,26 @@ def validate_and_finalize_build(bom_results, project_context):
             types_to_remove = [r['part_type'] for r in replacements]
             kept_parts = [p for p in current_bom if p['part_type'] not in types_to_remove]
             
-            # Trigger Sourcing for NEW parts
-            new_search_tasks = [
-                source_component_task.s(r['part_type'], r['new_search_query'])
-                for r in replacements
-            ]
-            
             # Update iteration count
             project_context["iteration"] = iteration + 1
+
+            # Small fixes: re-source in this task and recurse directly (no broker hop)
+            if len(replacements) <= INLINE_RESOURCE_MAX:
+                new_parts = run_async(_source_parts([(r['part_type'], r['new_search_query']) for r in replacements]))
+                return merge_and_revalidate(new_parts, kept_parts, project_context)
+
+            # Trigger Sourcing for NEW parts (one batched task)
+            new_searches = [(r['part_type'], r['new_search_query']) for r in replacements]
             
             # RECURSION via Callback
-            return chord(
-                new_search_tasks,
+            return chain(
+                source_components_batch.s(new_searches),
                 merge_and_revalidate.s(kept_parts, project_context)
             ).apply_async()
     
+    # Everything below (CAD params, assets, schematic, cost) runs once per
+    # build, on the pass whose BOM is final -- never on an optimizer pass
+
     # --- STEP 2: GEOMETRIC PHYSICS & CAD (The "Does it Fit?" Check) ---
     logger.info("✅ Numerical Physics Passed. Generating Geometry...")
     
@@ -167,9 +216,7 @@ def validate_and_finalize_build(bom_results, project_context):
         "fabrication_specs": assets['calculated_specs']
     }
     
-    assembly_guide = run_async(generate_assembly_instructions(doc_context))
-    schematic_path = generate_wiring_diagram(project_id, [p.get('product_name', '') for p in current_bom])
-    cost_report = generate_procurement_manifest(current_bom)
+    assembly_guide, schematic_path, cost_report = run_async(_document(project_id, current_bom, doc_context))
     
     # Final Master Record
     master_record = {
@@ -195,8 +242,10 @@ def validate_and_finalize_build(bom_results, project_context):
     
     # Save to disk
     output_path = os.path.join("static", "generated", f"{project_id}_MASTER.json")
-    with open(output_path, "w") as f:
-        json.dump(master_record, f, indent=2)
+    # orjson: C encoder; NON_STR_KEYS keeps json.dump's int-key behaviour.
+    # Written before returning: the record must exist once the result is COMPLETE.
+    payload = orjson.dumps(master_record, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    _write_file(output_path, payload)
         
     return master_record
 
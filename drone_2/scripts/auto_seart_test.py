@@ -52,7 +52,7 @@ async def main():
         print(f"   Query: '{query}'")
         
         # Request 5 results this time
-        results = find_components(query, limit=5)
+        results = await find_components(query, limit=5)
         
         if results:
             print(f"   ✅ Found {len(results)} options:")
@@ -75,7 +75,7 @@ async def main():
     for item in buy_list[:2]: # Demo first 2 items
         query = item['search_query']
         print(f"\n🔎 Searching for: {query}")
-        results = find_components(query, limit=2)
+        results = await find_components(query, limit=2)
         for res in results:
              print(f"   - found: {res['title'][:50]}... (${res['price']})")
 
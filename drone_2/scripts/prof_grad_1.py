@@ -241,7 +241,7 @@ async def main():
         # G. FINAL OUTPUT
         logger.info("📦 Step 12: Generating Final Deliverables...")
         
-        schematic_path = generate_wiring_diagram(project_id, [p.get('product_name', '') for p in current_bom])
+        schematic_path = generate_wiring_diagram(project_id, [p.get('product_name') or '' for p in current_bom])
         cost = generate_procurement_manifest(current_bom)
         
         # Populate Final Deliverables in Master Log
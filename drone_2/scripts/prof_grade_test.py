@@ -4,6 +4,8 @@ import sys
 import os
 import json
 import base64
+import mmap
+import re
 import webbrowser
 from datetime import datetime
 from copy import deepcopy
@@ -30,15 +32,24 @@ from app.services.cad_service import generate_assets
 from app.services.schematic_service import generate_wiring_diagram
 from app.services.cost_service import generate_procurement_manifest
 
+# Meshes embedded into the report, in template placeholder order
+STL_ASSET_KEYS = ("frame", "motor", "fc", "prop", "battery", "camera")
+PLACEHOLDER_RE = re.compile(r"\[\[(\w+)\]\]")
+
+def _b64_of_file(path):
+    # Encodes straight from a read-only mapping: no intermediate copy of the file
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0: return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode('ascii')
+
 def file_to_b64(path):
     if not path or not os.path.exists(path): return ""
-    with open(path, "rb") as f:
-        return f"data:model/stl;base64,{base64.b64encode(f.read()).decode('utf-8')}"
+    return f"data:model/stl;base64,{_b64_of_file(path)}"
 
 def image_to_b64(path):
     if not path or not os.path.exists(path): return ""
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode('utf-8')
+    return _b64_of_file(path)
 
 async def main():
     print("\n==================================================")
@@ -108,14 +119,24 @@ async def main():
         revision_count += 1
         print(f"\n--- 🔄 REVISION {revision_count} START ---")
 
-        # 1. Sourcing (Delta Update)
-        for target_item in current_shopping_list:
-            part_type = target_item['part_type']
-            query = target_item.get('new_search_query') or target_item.get('search_query')
-            
+        # 1. Sourcing (Delta Update) - all parts in flight at once
+        queries = [
+            (item['part_type'], item.get('new_search_query') or item.get('search_query'))
+            for item in current_shopping_list
+        ]
+        for part_type, query in queries:
             print(f"🔎 Sourcing: {part_type} ('{query}')")
-            new_part_data = await fuse_component_data(part_type, query)
-            
+        new_parts = await asyncio.gather(
+            *(fuse_component_data(part_type, query) for part_type, query in queries),
+            return_exceptions=True,
+        )
+
+        # Apply in shopping-list order so replacements stay deterministic
+        for (part_type, query), new_part_data in zip(queries, new_parts):
+            if isinstance(new_part_data, Exception):
+                print(f"   ❌ Sourcing error for {part_type}: {new_part_data}")
+                new_part_data = None
+
             if new_part_data:
                 # Remove old part if exists (Replacement Logic)
                 current_bom = [p for p in current_bom if p['part_type'] != part_type]
@@ -199,7 +220,7 @@ async def main():
     steps = guide.get("steps", [])
     master_record["assembly"] = guide
 
-    schematic_path = generate_wiring_diagram(project_id, [p.get('product_name', '') for p in current_bom])
+    schematic_path = generate_wiring_diagram(project_id, [p.get('product_name') or '' for p in current_bom])
     if schematic_path: master_record["assembly"]["schematic_diagram"] = schematic_path
     
     cost_report = generate_procurement_manifest(current_bom)
@@ -218,23 +239,17 @@ async def main():
     
     with open(template_path, "r") as f: html = f.read()
     
-    html = html.replace('"[[FRAME_B64]]"', f'"{file_to_b64(assets.get("frame"))}"')
-    html = html.replace('"[[MOTOR_B64]]"', f'"{file_to_b64(assets.get("motor"))}"')
-    html = html.replace('"[[FC_B64]]"', f'"{file_to_b64(assets.get("fc"))}"')
-    html = html.replace('"[[PROP_B64]]"', f'"{file_to_b64(assets.get("prop"))}"')
-    html = html.replace('"[[BATTERY_B64]]"', f'"{file_to_b64(assets.get("battery"))}"')
-    html = html.replace('"[[CAMERA_B64]]"', f'"{file_to_b64(assets.get("camera"))}"')
-    
-    if schematic_path and os.path.exists(schematic_path):
-        html = html.replace('[[SCHEMATIC_B64]]', image_to_b64(schematic_path))
-    else:
-        html = html.replace('[[SCHEMATIC_B64]]', "")
-
-    html = html.replace('[[WHEELBASE]]', str(assets.get("wheelbase", 200)))
-    html = html.replace('[[STEPS_JSON]]', json.dumps(steps))
-    html = html.replace('[[PHYSICS_JSON]]', json.dumps(physics_report))
-    html = html.replace('[[SPECS_JSON]]', json.dumps(cad_specs))
-    html = html.replace('[[COST_JSON]]', json.dumps(cost_report))
+    table = {f"{key.upper()}_B64": file_to_b64(assets.get(key)) for key in STL_ASSET_KEYS}
+    table.update({
+        "SCHEMATIC_B64": image_to_b64(schematic_path),
+        "WHEELBASE": str(assets.get("wheelbase", 200)),
+        "STEPS_JSON": json.dumps(steps),
+        "PHYSICS_JSON": json.dumps(physics_report),
+        "SPECS_JSON": json.dumps(cad_specs),
+        "COST_JSON": json.dumps(cost_report),
+    })
+    # One pass over the template; unknown placeholders are left untouched
+    html = PLACEHOLDER_RE.sub(lambda m: table.get(m.group(1), m.group(0)), html)
     
     with open(output_path, "w") as f: f.write(html)
     webbrowser.open(f"file://{output_path}")
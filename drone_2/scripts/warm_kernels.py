@@ -0,0 +1,34 @@
+# FILE: scripts/warm_kernels.py
+#
+# Compiles every numba kernel once so its native code lands in the on-disk
+# cache (__pycache__/*.nbi, *.nbc, or $NUMBA_CACHE_DIR if set). Run it at
+# image build time and ship the cache: processes then load machine code on
+# their first warm-up instead of spending seconds compiling on every cold start.
+#
+# Importing the kernel modules no longer compiles anything; each module's
+# warm_kernels() calls its kernel once.
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    try:
+        import numba
+    except ImportError:
+        print("⚠️  numba is not installed; kernels run as plain Python, nothing to cache.")
+        return
+
+    import app.main  # _integrate_hover
+    import app.services.cad_service  # solve_geometry
+    import app.services.geometry_sim_service  # geometry_kernel
+    import app.services.physics_service  # flight_kernel
+
+    start = time.perf_counter()
+    for module in (app.main, app.services.cad_service, app.services.geometry_sim_service, app.services.physics_service):
+        module.warm_kernels()
+    print(f"✅ numba {numba.__version__}: kernels compiled and cached in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()